@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def local_caches(django_test_environment):
+    # Общий кэш в памяти процесса, как у manage.py test (core.runner).
+    from core.runner import local_caches
+
+    with local_caches():
+        yield
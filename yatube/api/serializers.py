@@ -0,0 +1,85 @@
+"""Компактное представление постов и комментариев для API.
+
+Каждое поле описано колонками, которые нужны для его значения, поэтому
+при выборе полей через ``?fields=`` запрос читает только их.
+"""
+from django.core.exceptions import ValidationError
+
+
+class Field:
+    def __init__(self, getter, columns, related=None):
+        self.getter = getter
+        self.columns = columns
+        self.related = related
+
+
+class Serializer:
+    fields = {}
+    # Колонки, которые нужны всегда: ключи курсора пагинации.
+    required_columns = ()
+
+    def __init__(self, fields=None):
+        if fields is None:
+            names = list(self.fields)
+        else:
+            names = [name for name in fields.split(',') if name]
+            unknown = [name for name in names if name not in self.fields]
+            if unknown or not names:
+                raise ValidationError(
+                    'Неизвестные поля: %(fields)s. Доступны: %(allowed)s.',
+                    params={
+                        'fields': ', '.join(unknown) or '—',
+                        'allowed': ', '.join(self.fields),
+                    }
+                )
+        self.names = names
+
+    def prepare(self, queryset):
+        """Ограничивает queryset колонками и связями выбранных полей."""
+        columns = set(self.required_columns)
+        related = set()
+        for name in self.names:
+            field = self.fields[name]
+            columns.update(field.columns)
+            if field.related:
+                related.add(field.related)
+        return queryset.select_related(*related).only(*columns)
+
+    def to_dict(self, obj):
+        return {name: self.fields[name].getter(obj) for name in self.names}
+
+
+def _username(obj):
+    return obj.author.username
+
+
+class PostSerializer(Serializer):
+    fields = {
+        'id': Field(lambda post: post.pk, ('id',)),
+        'text': Field(lambda post: post.text, ('text',)),
+        'pub_date': Field(lambda post: post.pub_date, ('pub_date',)),
+        'author': Field(
+            _username, ('author', 'author__username'), related='author'
+        ),
+        'group': Field(
+            lambda post: post.group.slug if post.group_id else None,
+            ('group', 'group__slug'),
+            related='group'
+        ),
+        'image': Field(
+            lambda post: post.image.url if post.image else None, ('image',)
+        ),
+    }
+    required_columns = ('id', 'pub_date')
+
+
+class CommentSerializer(Serializer):
+    fields = {
+        'id': Field(lambda comment: comment.pk, ('id',)),
+        'text': Field(lambda comment: comment.text, ('text',)),
+        'pub_date': Field(lambda comment: comment.pub_date, ('pub_date',)),
+        'author': Field(
+            _username, ('author', 'author__username'), related='author'
+        ),
+    }
+    required_columns = ('id', 'pub_date')
@@ -0,0 +1,138 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+URL_POSTS = reverse('api:posts')
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий'
+        )
+        cls.urls = [
+            URL_POSTS,
+            reverse('api:group_posts', args=[cls.group.slug]),
+            reverse('api:profile_posts', args=[cls.author.username]),
+            reverse('api:post_comments', args=[cls.post.pk]),
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, data=None, **headers):
+        response = self.client.get(url, data, **headers)
+        return response, response.json() if response.content else None
+
+    def test_endpoints(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response, data = self.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertTrue(response['ETag'].startswith('"'))
+                self.assertTrue(data['results'])
+
+    def test_post_representation(self):
+        response, data = self.get(URL_POSTS)
+        self.assertEqual(data['results'][0], {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': DjangoJSONEncoder().default(self.post.pub_date),
+            'author': 'author',
+            'group': 'test-slug',
+            'image': None,
+        })
+        self.assertNotIn(b': ', response.content)
+        self.assertIn('Пост'.encode(), response.content)
+
+    def test_fields_selection(self):
+        response, data = self.get(URL_POSTS, {'fields': 'id,author'})
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'author': 'author'}
+        )
+        self.assertEqual(response.query_stats.count, 1)
+        response, data = self.get(URL_POSTS, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('secret', data['detail'])
+
+    def test_cursor_pagination(self):
+        response, data = self.get(URL_POSTS, {'limit': 2, 'fields': 'id'})
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.posts[2].pk, self.posts[1].pk]
+        )
+        self.assertIsNone(data['previous'])
+        response, data = self.get(data['next'])
+        self.assertEqual(
+            [post['id'] for post in data['results']], [self.posts[0].pk]
+        )
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+        response, data = self.get(URL_POSTS, {'cursor': 'broken'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_not_modified_without_queries(self):
+        """Совпавший ETag даёт 304 без запросов к базе."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response, _ = self.get(url)
+                etag = response['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(response.query_stats.count, 0)
+
+    def test_etag_changes_with_content(self):
+        comments_url = reverse('api:post_comments', args=[self.post.pk])
+        etags = {url: self.get(url)[0]['ETag'] for url in self.urls}
+        Post.objects.create(
+            author=self.author, group=self.group, text='Новый'
+        )
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Ещё комментарий'
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(self.get(comments_url)[1]['results']), 2)
+
+    def test_not_found(self):
+        for url in (
+            reverse('api:group_posts', args=['missing']),
+            reverse('api:profile_posts', args=['missing']),
+            reverse('api:post_comments', args=[0]),
+        ):
+            with self.subTest(url=url):
+                response, data = self.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', data)
+                self.assertFalse(response.has_header('ETag'))
+
+    def test_read_only(self):
+        response = self.client.post(URL_POSTS, {'text': 'Пост'})
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
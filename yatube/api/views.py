@@ -0,0 +1,128 @@
+"""JSON API лент только для чтения.
+
+У каждого ответа есть сильный ETag из версии ленты (см.
+posts.feed_cache) и адреса запроса. Версия читается из кэша, поэтому
+на совпавший If-None-Match отвечаем 304, не обращаясь к базе.
+"""
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+from posts import feed_cache, groups
+from posts.models import Comment, Post, User
+from posts.paginator import (COMMENT_KEYS, DEFAULT_KEYS, InvalidCursor,
+                             KeysetPaginator)
+
+from .serializers import CommentSerializer, PostSerializer
+
+API_VERSION = 'v1'
+
+
+def _json(data, status=HTTPStatus.OK):
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def _error(message, status=HTTPStatus.BAD_REQUEST):
+    return _json({'detail': message}, status)
+
+
+def versioned(scope):
+    """Отвечает 304 по ETag из версии ленты scope(**kwargs) до вида."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            version = feed_cache.feed_version(*scope(**kwargs))
+            key = f'{API_VERSION}:{version}:{request.get_full_path()}'
+            etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, **kwargs)
+            if response.status_code in (HTTPStatus.OK,
+                                        HTTPStatus.NOT_MODIFIED):
+                response['ETag'] = etag
+            return response
+        return require_safe(wrapper)
+    return decorator
+
+
+def _page(request, queryset, serializer_class, keys=DEFAULT_KEYS):
+    """Страница выдачи по ?cursor=, ?limit= и ?fields=."""
+    try:
+        serializer = serializer_class(request.GET.get('fields'))
+    except ValidationError as error:
+        return _error(' '.join(error.messages))
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        return _error('limit должен быть числом.')
+    limit = min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+    paginator = KeysetPaginator(serializer.prepare(queryset), limit, keys)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor as error:
+        return _error(str(error))
+
+    def link(cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        return f'{request.path}?{query.urlencode()}'
+
+    return _json({
+        'results': [serializer.to_dict(obj) for obj in page],
+        'next': link(page.next_cursor),
+        'previous': link(page.previous_cursor),
+    })
+
+
+@versioned(lambda: ('index',))
+def posts(request):
+    return _page(request, Post.objects.all(), PostSerializer)
+
+
+@versioned(lambda slug: ('group', slug))
+def group_posts(request, slug):
+    group = groups.registry().get(slug)
+    if group is None:
+        return _error('Группа не найдена.', HTTPStatus.NOT_FOUND)
+    return _page(
+        request, Post.objects.filter(group_id=group.pk), PostSerializer
+    )
+
+
+@versioned(lambda username: ('profile', username))
+def profile_posts(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return _error('Автор не найден.', HTTPStatus.NOT_FOUND)
+    return _page(
+        request, Post.objects.filter(author_id=author_id), PostSerializer
+    )
+
+
+@versioned(lambda post_id: ('post', post_id))
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('Пост не найден.', HTTPStatus.NOT_FOUND)
+    return _page(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        CommentSerializer,
+        keys=COMMENT_KEYS
+    )
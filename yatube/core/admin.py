@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Job, OutboundEmail
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'task', 'status', 'priority', 'attempts', 'run_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'key')
+    readonly_fields = ('created', 'locked_by', 'locked_at', 'last_error')
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'created', 'attempts', 'locked_at')
+    readonly_fields = ('created', 'locked_by', 'locked_at', 'last_error')
+
+
+admin.site.register(Job, JobAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db import signals  # noqa: F401
+
+        # Задачи очереди core.jobs регистрируются модулями tasks.py.
+        autodiscover_modules('tasks')
@@ -0,0 +1,195 @@
+"""Замеры производительности страниц на синтетических данных.
+
+Набор данных (см. posts.seeding) создаётся во временных тестовой базе
+и каталоге MEDIA_ROOT, после чего каждый маршрут из posts.urls и
+users.urls запрашивается тестовым клиентом гостем и авторизованным
+пользователем. Для каждой пары считаются p50/p99 времени ответа, число
+SQL-запросов и пик выделенной памяти (tracemalloc). Результат — JSON,
+который можно сравнить с результатом другого коммита (см. compare()).
+
+Кэш берётся из настроек: после заполнения базы версия всех лент
+увеличивается, чтобы не отдать страницы с прошлого прогона, поэтому
+не запускайте замеры на боевом кэше.
+"""
+import math
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts import urls as posts_urls
+from posts.models import Group, Post, User
+from posts.seeding import Seeder
+from users import urls as users_urls
+
+URLCONFS = (('posts', posts_urls), ('users', users_urls))
+# Маршруты, после которых клиент нужно снова авторизовать.
+RELOGIN = {'users:logout'}
+ALLOCATION_SAMPLES = 5
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу: percentile(values, 0.99)."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def _samples():
+    """Аргументы URL: самые нагруженные автор, группа и пост."""
+    author = User.objects.order_by('-profile__posts_count', 'pk').first()
+    group = Group.objects.order_by('-posts_count', 'pk').first()
+    post = Post.objects.filter(author=author).order_by(
+        '-comments_count', 'pk'
+    ).first() or Post.objects.first()
+    # Токен сброса пароля зависит от last_login, поэтому он берётся
+    # у пользователя, которого замеры не авторизуют.
+    stranger = User.objects.exclude(pk=author.pk).first() or author
+    return author, {
+        'slug': group.slug if group else 'missing',
+        'username': author.username,
+        'post_id': post.pk if post else 0,
+        'uidb64': urlsafe_base64_encode(force_bytes(stranger.pk)),
+        'token': default_token_generator.make_token(stranger),
+    }
+
+
+def routes(kwargs):
+    """Пары (имя, адрес) для всех маршрутов URLCONFS."""
+    for namespace, urlconf in URLCONFS:
+        for pattern in urlconf.urlpatterns:
+            name = f'{namespace}:{pattern.name}'
+            yield name, reverse(name, kwargs={
+                argument: kwargs[argument]
+                for argument in pattern.pattern.converters
+            })
+
+
+def _measure(client, path, requests, warmup, relogin):
+    def get():
+        response = client.get(path)
+        if relogin is not None:
+            relogin()
+        return response
+
+    for _ in range(warmup):
+        get()
+    timings, queries = [], []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(response.query_stats.count)
+        if relogin is not None:
+            relogin()
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(min(requests, ALLOCATION_SAMPLES)):
+            tracemalloc.clear_traces()
+            client.get(path)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            if relogin is not None:
+                relogin()
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': max(queries),
+        'alloc_kib': round(statistics.median(peaks) / 1024, 1),
+    }
+
+
+@contextmanager
+def benchmark_environment():
+    """Временные тестовая база и MEDIA_ROOT на время замеров.
+
+    Фоновые задачи выполняются сразу: обработчиков очереди у временной
+    базы нет. Реплики отключаются: тестовая база создаётся только
+    вместо основной. Ограничение частоты отключается: замеры повторяют
+    один запрос чаще любого лимита.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root, JOBS_EAGER=True,
+                                  DATABASE_REPLICAS=[],
+                                  RATELIMIT_ENABLED=False):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@override_settings(DEBUG=False)
+def run(requests=50, warmup=5, **seed_options):
+    """Сеет данные и замеряет все маршруты; возвращает словарь для JSON.
+
+    seed_options — параметры posts.seeding.Seeder.
+    """
+    started = time.perf_counter()
+    Seeder(**seed_options).run()
+    seed_seconds = time.perf_counter() - started
+    author, kwargs = _samples()
+    guest = Client(HTTP_HOST='localhost')
+    member = Client(HTTP_HOST='localhost')
+    member.force_login(author)
+    clients = {
+        'anonymous': (guest, None),
+        'authenticated': (member, lambda: member.force_login(author)),
+    }
+    results = []
+    for name, path in routes(kwargs):
+        for audience, (client, relogin) in clients.items():
+            results.append({
+                'route': name,
+                'audience': audience,
+                'path': path,
+                **_measure(
+                    client, path, requests, warmup,
+                    relogin if name in RELOGIN else None
+                ),
+            })
+    return {
+        'meta': {
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'requests': requests,
+            'warmup': warmup,
+            'dataset': seed_options,
+            'seed_seconds': round(seed_seconds, 2),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """Строки, где p50 вырос больше чем на threshold или выросли запросы."""
+    before = {
+        (row['route'], row['audience']): row for row in baseline['results']
+    }
+    regressions = []
+    for row in current['results']:
+        old = before.get((row['route'], row['audience']))
+        if old is None:
+            continue
+        slower = row['p50_ms'] > old['p50_ms'] * (1 + threshold)
+        if slower or row['queries'] > old['queries']:
+            regressions.append({
+                'route': row['route'],
+                'audience': row['audience'],
+                'p50_ms': (old['p50_ms'], row['p50_ms']),
+                'queries': (old['queries'], row['queries']),
+            })
+    return regressions
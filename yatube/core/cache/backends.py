@@ -0,0 +1,360 @@
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .resp import ReplyError, encode_command, read_reply
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    """Двухуровневый кэш: локальный LRU процесса перед общим кэшем.
+
+    L1 хранит значения не дольше ``L1_TIMEOUT`` секунд, поэтому удаление
+    ключа в другом процессе становится видно с этой задержкой. Ключи
+    с префиксами ``L1_BYPASS_PREFIXES`` (версии лент) всегда читаются
+    из общего кэша: ключи фрагментов содержат версию, и после её
+    увеличения старые копии в L1 больше не запрашиваются.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._bypass_prefixes = tuple(options.get('L1_BYPASS_PREFIXES', ()))
+        self.local = LocMemCache(f'tiered-l1-{location}', {
+            'TIMEOUT': self._l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)},
+        })
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_timeout(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self._l1_timeout
+        return min(timeout, self._l1_timeout)
+
+    def _bypass(self, key):
+        return key.startswith(self._bypass_prefixes)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added and not self._bypass(key):
+            self.local.set(key, value, self._local_timeout(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        if self._bypass(key):
+            return self.shared.get(key, default, version)
+        value = self.local.get(key, _MISSING, version)
+        if value is _MISSING:
+            value = self.shared.get(key, _MISSING, version)
+            if value is _MISSING:
+                return default
+            self.local.set(key, value, self._l1_timeout, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        if self._bypass(key):
+            return
+        local_timeout = self._local_timeout(timeout)
+        if local_timeout > 0:
+            self.local.set(key, value, local_timeout, version)
+        else:
+            self.local.delete(key, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version)
+        self.shared.delete(key, version)
+
+    def has_key(self, key, version=None):
+        if not self._bypass(key) and self.local.has_key(key, version):
+            return True
+        return self.shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(key, version)
+        return self.shared.incr(key, delta, version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+
+class SQLiteCache(BaseCache):
+    """Общий кэш в отдельном файле SQLite, одном на все воркеры."""
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(
+                self._path, timeout=5, isolation_level=None,
+                check_same_thread=False
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            self._local.db = db
+        return db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _load(self, db, key):
+        row = db.execute(
+            'SELECT value, expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return _MISSING
+        value, expires = row
+        if expires is not None and expires <= time.time():
+            db.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return _MISSING
+        return pickle.loads(value)
+
+    def _store(self, db, key, value, timeout):
+        db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (
+                key,
+                pickle.dumps(value, self.pickle_protocol),
+                self.get_backend_timeout(timeout),
+            )
+        )
+        self._cull(db)
+
+    def _cull(self, db):
+        count, = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count <= self._max_entries:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache')
+            return
+        db.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY expires IS NULL, expires '
+            'LIMIT ?)',
+            (count // self._cull_frequency,)
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            if self._load(db, key) is not _MISSING:
+                return False
+            self._store(db, key, value, timeout)
+        return True
+
+    def get(self, key, default=None, version=None):
+        value = self._load(self._db, self._key(key, version))
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            self._store(db, key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (
+                self.get_backend_timeout(timeout),
+                self._key(key, version),
+                time.time(),
+            )
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        self._db.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def has_key(self, key, version=None):
+        return self._load(self._db, self._key(key, version)) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            value = self._load(db, key)
+            if value is _MISSING:
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), key)
+            )
+        return value
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+
+class RedisCache(BaseCache):
+    """Клиент для Redis или совместимого сервера (в т.ч. FakeRedisServer).
+
+    Целые числа хранятся как есть, чтобы incr() выполнялся атомарно
+    командой INCRBY; остальные значения сериализуются pickle.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        url = urlparse(location)
+        self._address = (url.hostname or '127.0.0.1', url.port or 6379)
+        self._db_number = int(url.path.strip('/') or 0)
+        self._socket_timeout = params.get('OPTIONS', {}).get(
+            'SOCKET_TIMEOUT', 1
+        )
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection(
+                self._address, timeout=self._socket_timeout
+            )
+            connection = (sock, sock.makefile('rb'))
+            self._local.connection = connection
+            if self._db_number:
+                self._execute('SELECT', self._db_number)
+        return connection
+
+    def _execute(self, *args):
+        sock, stream = self._connection()
+        try:
+            sock.sendall(encode_command(*args))
+            reply = read_reply(stream)
+        except (OSError, ConnectionError):
+            self._disconnect()
+            raise
+        if isinstance(reply, ReplyError):
+            raise reply
+        return reply
+
+    def _disconnect(self):
+        # close() не переопределяется: Django вызывает его после каждого
+        # запроса, а соединение потока должно переживать запросы.
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            sock, stream = connection
+            stream.close()
+            sock.close()
+            self._local.connection = None
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dump(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _load(self, data):
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def _expiry(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        return ('PX', max(int(timeout * 1000), 1))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout == 0:
+            return False
+        reply = self._execute(
+            'SET', self._key(key, version), self._dump(value),
+            *self._expiry(timeout), 'NX'
+        )
+        return reply is not None
+
+    def get(self, key, default=None, version=None):
+        data = self._execute('GET', self._key(key, version))
+        return default if data is None else self._load(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if timeout == 0:
+            self._execute('DEL', key)
+            return
+        self._execute('SET', key, self._dump(value), *self._expiry(timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if not expiry:
+            self._execute('PERSIST', key)
+            return self._execute('EXISTS', key) == 1
+        return self._execute('PEXPIRE', key, expiry[1]) == 1
+
+    def delete(self, key, version=None):
+        self._execute('DEL', self._key(key, version))
+
+    def has_key(self, key, version=None):
+        return self._execute('EXISTS', self._key(key, version)) == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self._execute('EXISTS', key):
+            raise ValueError(f"Key '{key}' not found")
+        return self._execute('INCRBY', key, delta)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._execute(
+            'MGET', *(self._key(key, version) for key in keys)
+        )
+        return {
+            key: self._load(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+
+    def clear(self):
+        self._execute('FLUSHDB')
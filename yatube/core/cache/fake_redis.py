@@ -0,0 +1,146 @@
+"""Встроенный сервер, говорящий на протоколе Redis.
+
+Поддерживает только команды, которые использует RedisCache. Годится
+для тестов и для локального запуска нескольких воркеров без
+настоящего Redis, но не для продакшена: данные живут в памяти процесса.
+"""
+import socketserver
+import threading
+import time
+
+from .resp import ReplyError, encode_reply, read_reply
+
+
+class FakeRedisStore:
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def execute(self, command, *args):
+        handler = getattr(self, 'cmd_' + command.decode().lower(), None)
+        if handler is None:
+            return ReplyError(f'ERR unknown command {command.decode()!r}')
+        with self._lock:
+            try:
+                return handler(*args)
+            except (TypeError, ValueError) as error:
+                return ReplyError(f'ERR {error}')
+
+    def cmd_ping(self, *args):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_quit(self):
+        return 'OK'
+
+    def cmd_get(self, key):
+        return self._data[key] if self._alive(key) else None
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b'PX' in options:
+            milliseconds = int(options[options.index(b'PX') + 1])
+            expires = time.time() + milliseconds / 1000
+        exists = self._alive(key)
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        self._data[key] = value
+        self._expires[key] = expires
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        deleted = 0
+        for key in keys:
+            if self._alive(key):
+                del self._data[key]
+                self._expires.pop(key, None)
+                deleted += 1
+        return deleted
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def cmd_incrby(self, key, delta):
+        value = int(self._data[key]) if self._alive(key) else 0
+        value += int(delta)
+        self._data[key] = str(value).encode()
+        self._expires.setdefault(key, None)
+        return value
+
+    def cmd_pexpire(self, key, milliseconds):
+        if not self._alive(key):
+            return 0
+        self._expires[key] = time.time() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_persist(self, key):
+        if not self._alive(key) or self._expires.get(key) is None:
+            return 0
+        self._expires[key] = None
+        return 1
+
+    def cmd_flushdb(self):
+        self._data.clear()
+        self._expires.clear()
+        return 'OK'
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, ValueError):
+                return
+            if not isinstance(command, list) or not command:
+                return
+            reply = self.server.store.execute(*command)
+            self.wfile.write(encode_reply(reply))
+            if command[0].upper() == b'QUIT':
+                return
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """Сервер в отдельном потоке: ``with FakeRedisServer() as server``."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _Handler)
+        self.store = FakeRedisStore()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,69 @@
+"""Минимальная реализация протокола RESP (Redis serialization protocol)."""
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class ReplyError(Exception):
+    """Ошибка, которую сервер вернул в ответ на команду."""
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+def encode_command(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        arg = _to_bytes(arg)
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def encode_reply(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, ReplyError):
+        return b'-%s\r\n' % str(value).encode()
+    if isinstance(value, bool):
+        return b':%d\r\n' % value
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, (list, tuple)):
+        return b'*%d\r\n' % len(value) + b''.join(
+            encode_reply(item) for item in value
+        )
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def read_reply(stream):
+    """Читает один ответ или команду из файлоподобного потока."""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('Соединение закрыто')
+    if not line.endswith(b'\r\n'):
+        raise ProtocolError(line)
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode()
+    if kind == b'-':
+        return ReplyError(body.decode())
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(body)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise ProtocolError(line)
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from core.db.pool import PersistentConnectionMixin
+
+
+class DatabaseWrapper(PersistentConnectionMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,126 @@
+"""Постоянные соединения с проверкой здоровья и пул соединений процесса.
+
+Django 2.2 переиспользует соединение потока между запросами
+(CONN_MAX_AGE), но не проверяет его перед этим: оборванное сервером
+соединение всплывает ошибкой в первом же запросе. С CONN_HEALTH_CHECKS
+в настройках базы соединение проверяется перед первым обращением к
+базе в каждом HTTP-запросе; запросы, не дошедшие до базы, проверку не
+оплачивают.
+
+POOL_SIZE > 0 включает пул процесса: закрытое соединение возвращается
+в пул, а не закрывается, и следующий поток берёт его оттуда вместо
+установки нового. Это нужно многопоточным серверам, где соединение
+потока живёт ровно столько, сколько поток.
+"""
+import os
+import queue
+import threading
+
+from django.db.utils import DatabaseError
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Свободные соединения драйвера, последнее возвращённое — первым."""
+
+    def __init__(self, size):
+        self.size = size
+        self._idle = queue.LifoQueue(size)
+
+    def get(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return None
+
+    def put(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            return False
+        return True
+
+    def clear(self):
+        while True:
+            connection = self.get()
+            if connection is None:
+                return
+            connection.close()
+
+
+def get_pool(alias, size):
+    # После fork соединения родителя использовать нельзя: у каждого
+    # процесса свой пул.
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(size)
+        return _pools[key]
+
+
+def _is_alive(connection):
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+class PersistentConnectionMixin:
+    """Проверка здоровья и пул для DatabaseWrapper любого бэкенда."""
+
+    health_check_done = False
+
+    @property
+    def pool(self):
+        size = self.settings_dict.get('POOL_SIZE') or 0
+        return get_pool(self.alias, size) if size > 0 else None
+
+    def reset_health_check(self):
+        """Вызывается в начале каждого HTTP-запроса (core.db.signals)."""
+        self.health_check_done = False
+
+    def connect(self):
+        # Только что установленное соединение проверять незачем.
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        if (self.connection is not None
+                and self.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not self.health_check_done):
+            self.health_check_done = True
+            if not self.in_atomic_block and not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        while pool is not None:
+            connection = pool.get()
+            if connection is None:
+                break
+            if _is_alive(connection):
+                return connection
+            try:
+                connection.close()
+            except DatabaseError:
+                pass
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        pool = self.pool
+        if (pool is not None and not self.in_atomic_block
+                and not self.errors_occurred):
+            with self.wrap_database_errors:
+                if not self.get_autocommit():
+                    self.connection.rollback()
+            if pool.put(self.connection):
+                return
+        super()._close()
@@ -0,0 +1,67 @@
+"""Чтение с реплик для лент, запись — всегда в основную базу.
+
+Реплики перечислены в settings.DATABASE_REPLICAS. Чтения уходят на них
+только внутри replica_reads() — его включает ReplicaRoutingMiddleware
+для видов из settings.REPLICA_VIEWS; всё остальное, в том числе чтения
+во время записи, идёт в основную базу, так что фоновые потоки и
+команды управления реплик не видят.
+
+Запись в любой момент запроса отмечается в состоянии роутера: по
+этой отметке middleware на REPLICA_PIN_SECONDS закрепляет пользователя
+за основной базой, и он видит свою запись, пока реплика догоняет.
+Собранное по реплике вскоре после изменения ленты не кэшируется
+под её новой версией (см. posts.feed_cache.cacheable).
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+# Сохранение сессии — не запись данных, которые пользователь ждёт
+# увидеть, и не повод закреплять его за основной базой.
+UNPINNED_APPS = {'sessions'}
+
+
+@contextmanager
+def routing():
+    """Состояние роутера на время одного запроса."""
+    _state.replica = False
+    _state.wrote = False
+    try:
+        yield _state
+    finally:
+        _state.replica = False
+
+
+def replica_reads():
+    """Дальнейшие чтения этого запроса идут на реплики."""
+    _state.replica = True
+
+
+def reading_from_replica():
+    return getattr(_state, 'replica', False) and bool(
+        settings.DATABASE_REPLICAS
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reading_from_replica():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in UNPINNED_APPS:
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему на реплики переносит репликация.
+        return db not in settings.DATABASE_REPLICAS
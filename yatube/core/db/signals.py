@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """PRAGMA из settings.SQLITE_PRAGMAS для каждого нового соединения.
+
+    WAL позволяет читателям не ждать писателя, busy_timeout — писателям
+    ждать друг друга вместо ошибки «database is locked».
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(request_started)
+def reset_health_checks(**kwargs):
+    for connection in connections.all():
+        reset = getattr(connection, 'reset_health_check', None)
+        if reset is not None:
+            reset()
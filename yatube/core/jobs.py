@@ -0,0 +1,250 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача — функция, отмеченная декоратором @task; вызов
+``func.delay(*args, **kwargs)`` записывает её в таблицу Job в текущей
+транзакции: задача появится в очереди, только если запрос, её
+поставивший, зафиксировал свои изменения. Аргументы хранятся в JSON.
+
+Задачи выполняет ``manage.py run_workers`` (см. Worker). Обработчик
+забирает задачу условным UPDATE, а не блокировкой строки, поэтому
+очередь работает и на SQLite. Раньше выполняются задачи с большим
+приоритетом, при равном — поставленные раньше. Упавшая задача
+повторяется через JOB_RETRY_DELAY * 2 ** (попытка - 1) секунд, но не
+позже чем через JOB_RETRY_MAX_DELAY; после последней попытки она
+остаётся в таблице в состоянии FAILED с текстом ошибки. Задача,
+взятая дольше JOB_TIMEOUT секунд назад, считается брошенной упавшим
+обработчиком и возвращается в очередь, если у неё остались попытки,
+иначе помечается FAILED с ошибкой WORKER_LOST.
+
+При settings.JOBS_EAGER (включают тесты) delay() выполняет задачу сразу
+и пробрасывает её исключения.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+# Сколько кандидатов читать за раз: остальные обработчики могут
+# забрать первых раньше.
+CLAIM_BATCH = 10
+# Ошибка задачи, обработчик которой пропал во время выполнения.
+WORKER_LOST = 'worker lost'
+
+REGISTRY = {}
+
+
+class Task:
+    """Функция, которую можно поставить в очередь."""
+
+    def __init__(self, func, name, priority, max_attempts, key):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.key = key
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        """Ставит задачу в очередь с параметрами по умолчанию."""
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, priority=None, countdown=0):
+        """Ставит задачу в очередь и возвращает ждущую задачу Job.
+
+        Если задача с тем же ключом уже ждёт, возвращается она. При
+        JOBS_EAGER задача выполняется сразу, и результат — None.
+        """
+        kwargs = kwargs or {}
+        encoded_args = json.dumps(list(args))
+        encoded_kwargs = json.dumps(kwargs)
+        if settings.JOBS_EAGER:
+            self.func(*args, **kwargs)
+            return None
+        job = Job(
+            task=self.name,
+            args=encoded_args,
+            kwargs=encoded_kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            key=self.key(*args, **kwargs) if self.key else None,
+            run_at=timezone.now() + timedelta(seconds=countdown)
+        )
+        if job.key is None:
+            job.save()
+            return job
+        # Повтор ключа отбрасывает уникальный индекс по ждущим задачам.
+        Job.objects.bulk_create([job], ignore_conflicts=True)
+        return Job.objects.filter(key=job.key, status=Job.QUEUED).first()
+
+
+def task(name=None, priority=PRIORITY_NORMAL, max_attempts=None, key=None):
+    """Регистрирует функцию как задачу очереди.
+
+    key(*args, **kwargs) — ключ, по которому повторная постановка
+    ждущей задачи схлопывается; max_attempts по умолчанию
+    settings.JOB_MAX_ATTEMPTS.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        registered = Task(
+            func,
+            task_name,
+            priority,
+            max_attempts or settings.JOB_MAX_ATTEMPTS,
+            key
+        )
+        REGISTRY[task_name] = registered
+        return registered
+    return decorator
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой после attempts неудачных."""
+    return min(
+        settings.JOB_RETRY_DELAY * 2 ** max(attempts - 1, 0),
+        settings.JOB_RETRY_MAX_DELAY
+    )
+
+
+def _requeue(pk, **fields):
+    """Возвращает выполнявшуюся задачу pk в очередь."""
+    try:
+        with transaction.atomic():
+            return Job.objects.filter(pk=pk, status=Job.RUNNING).update(
+                status=Job.QUEUED, locked_by='', locked_at=None, **fields
+            )
+    except IntegrityError:
+        # Задача с тем же ключом уже ждёт и сделает ту же работу.
+        Job.objects.filter(pk=pk, status=Job.RUNNING).delete()
+        return 0
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, брошенные упавшими обработчиками.
+
+    Попытка брошенной задачи засчитывается, как и упавшей: задача,
+    которая сама роняет обработчик, после последней попытки помечается
+    FAILED, а не перезапускается бесконечно. Возвращает число задач,
+    вернувшихся в очередь.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=deadline)
+    for job in stale.filter(attempts__gte=F('max_attempts')):
+        logger.error(
+            'Задача %s не выполнена за %s попыток: %s',
+            job, job.attempts, WORKER_LOST
+        )
+        Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+            status=Job.FAILED, last_error=WORKER_LOST
+        )
+    pks = list(stale.values_list('pk', flat=True))
+    return sum(_requeue(pk, last_error=WORKER_LOST) for pk in pks)
+
+
+class Worker:
+    """Забирает задачи из очереди и выполняет их по одной."""
+
+    def __init__(self, name=None):
+        self.name = name or (
+            f'{socket.gethostname()}:{os.getpid()}:'
+            f'{threading.current_thread().name}'
+        )
+
+    def claim(self):
+        """Забирает следующую готовую задачу или возвращает None."""
+        now = timezone.now()
+        candidates = Job.objects.filter(
+            status=Job.QUEUED, run_at__lte=now
+        ).order_by('-priority', 'run_at', 'id').values_list(
+            'pk', flat=True
+        )[:CLAIM_BATCH]
+        for pk in candidates:
+            claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING,
+                locked_by=self.name,
+                locked_at=now,
+                attempts=F('attempts') + 1
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+        return None
+
+    def execute(self, job):
+        registered = REGISTRY.get(job.task)
+        try:
+            if registered is None:
+                raise LookupError(f'Неизвестная задача {job.task}')
+            registered.func(*json.loads(job.args), **json.loads(job.kwargs))
+        except Exception:
+            self.fail(job, traceback.format_exc())
+        else:
+            Job.objects.filter(pk=job.pk).delete()
+
+    def fail(self, job, error):
+        if job.attempts >= job.max_attempts:
+            logger.error(
+                'Задача %s не выполнена за %s попыток:\n%s',
+                job, job.attempts, error
+            )
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, last_error=error
+            )
+            return
+        delay = retry_delay(job.attempts)
+        logger.warning(
+            'Задача %s упала, повтор через %s с:\n%s', job, delay, error
+        )
+        _requeue(
+            job.pk,
+            last_error=error,
+            run_at=timezone.now() + timedelta(seconds=delay)
+        )
+
+    def run_once(self):
+        """Выполняет одну задачу; False, если готовых задач нет."""
+        job = self.claim()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def run(self, stop, poll_interval, burst=False):
+        """Выполняет задачи, пока не выставлено событие stop.
+
+        При burst завершается, как только очередь опустела. Брошенные
+        задачи проверяются раз в половину JOB_TIMEOUT.
+        """
+        next_check = 0
+        try:
+            while not stop.is_set():
+                if time.monotonic() >= next_check:
+                    requeue_stale()
+                    next_check = time.monotonic() + settings.JOB_TIMEOUT / 2
+                if self.run_once():
+                    continue
+                if burst:
+                    return
+                stop.wait(poll_interval)
+        finally:
+            connections.close_all()
@@ -0,0 +1,173 @@
+"""Очередь исходящей почты.
+
+SpoolBackend — почтовый бэкенд Django, который не отправляет письма,
+а одной вставкой сохраняет их в таблицу OutboundEmail в текущей
+транзакции и ставит задачу core.tasks.flush_outbox. Задача забирает
+пачку до EMAIL_BATCH_SIZE писем и отправляет их через
+EMAIL_DELIVERY_BACKEND одним соединением, а пока письма остаются,
+ставит себя снова. Письмо, которое не удалось отправить, не мешает
+остальным: оно откладывается на core.jobs.retry_delay(попытки) секунд,
+а после JOB_MAX_ATTEMPTS неудач остаётся в таблице с текстом ошибки.
+"""
+import base64
+import json
+import logging
+import math
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .jobs import retry_delay
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_content(content):
+    if isinstance(content, bytes):
+        return {'base64': base64.b64encode(content).decode('ascii')}
+    return {'text': content}
+
+
+def _decode_content(content):
+    if 'base64' in content:
+        return base64.b64decode(content['base64'])
+    return content['text']
+
+
+def encode(message):
+    """Письмо EmailMessage в JSON для OutboundEmail.message."""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise TypeError(
+                'Вложения MIMEBase в очередь писем не сохраняются'
+            )
+        filename, content, mimetype = attachment
+        attachments.append([filename, _encode_content(content), mimetype])
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    }, ensure_ascii=False)
+
+
+def decode(data):
+    """Обратное к encode(): EmailMultiAlternatives без соединения."""
+    fields = json.loads(data)
+    message = EmailMultiAlternatives(
+        subject=fields['subject'],
+        body=fields['body'],
+        from_email=fields['from_email'],
+        to=fields['to'],
+        cc=fields['cc'],
+        bcc=fields['bcc'],
+        reply_to=fields['reply_to'],
+        headers=fields['headers'],
+        alternatives=[tuple(item) for item in fields['alternatives']],
+    )
+    for filename, content, mimetype in fields['attachments']:
+        message.attach(filename, _decode_content(content), mimetype)
+    return message
+
+
+def _waiting():
+    """Письма, которые ещё будут отправлены и сейчас никем не взяты."""
+    stale = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+    return OutboundEmail.objects.filter(
+        Q(locked_at__isnull=True) | Q(locked_at__lt=stale),
+        attempts__lt=settings.JOB_MAX_ATTEMPTS
+    )
+
+
+def _ready():
+    """Письма, которые можно взять в отправку."""
+    return _waiting().filter(send_after__lte=timezone.now())
+
+
+def next_flush_in():
+    """Через сколько секунд отправлять следующее письмо; None — нечего."""
+    send_after = _waiting().aggregate(first=Min('send_after'))['first']
+    if send_after is None:
+        return None
+    return max(math.ceil((send_after - timezone.now()).total_seconds()), 0)
+
+
+def _defer(email, error):
+    """Записывает ошибку отправки и откладывает письмо до новой попытки."""
+    attempts = email.attempts + 1
+    if attempts >= settings.JOB_MAX_ATTEMPTS:
+        logger.error(
+            '%s не отправлено за %s попыток: %r', email, attempts, error
+        )
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        attempts=F('attempts') + 1,
+        last_error=repr(error),
+        locked_by='',
+        locked_at=None,
+        send_after=timezone.now() + timedelta(seconds=retry_delay(attempts))
+    )
+
+
+def flush(batch_size=None):
+    """Отправляет пачку писем одним соединением; возвращает их число.
+
+    Пачка забирается условным UPDATE, как задачи core.jobs. Письмо,
+    которое не удалось отправить, откладывается, а отправка пачки
+    продолжается. Если не удалось открыть соединение, пачка
+    возвращается в очередь, а исключение пробрасывается, чтобы задача
+    повторилась позже.
+    """
+    token = uuid.uuid4().hex
+    candidates = list(_ready().order_by('pk').values_list(
+        'pk', flat=True
+    )[:batch_size or settings.EMAIL_BATCH_SIZE])
+    _ready().filter(pk__in=candidates).update(
+        locked_by=token, locked_at=timezone.now()
+    )
+    emails = OutboundEmail.objects.filter(locked_by=token).order_by('pk')
+    sent = []
+    try:
+        with get_connection(settings.EMAIL_DELIVERY_BACKEND) as connection:
+            for email in emails:
+                try:
+                    connection.send_messages([decode(email.message)])
+                except Exception as error:
+                    _defer(email, error)
+                else:
+                    sent.append(email.pk)
+    finally:
+        OutboundEmail.objects.filter(pk__in=sent).delete()
+        OutboundEmail.objects.filter(locked_by=token).update(
+            locked_by='', locked_at=None
+        )
+    return len(sent)
+
+
+class SpoolBackend(BaseEmailBackend):
+    """Ставит письма в очередь OutboundEmail вместо отправки."""
+
+    def send_messages(self, email_messages):
+        # Импорт здесь: задачи регистрируются после загрузки моделей.
+        from .tasks import flush_outbox
+
+        spooled = OutboundEmail.objects.bulk_create([
+            OutboundEmail(message=encode(message))
+            for message in email_messages
+            if message.recipients()
+        ])
+        if spooled:
+            flush_outbox.delay()
+        return len(spooled)
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import CommandError
+
+from core import benchmark
+from posts.management.commands.seed import Command as SeedCommand
+
+
+class Command(SeedCommand):
+    help = ('Замеряет время ответа, SQL-запросы и память страниц '
+            'на синтетических данных во временной базе')
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(
+            users=200, posts=2000, celebrities=1, celebrity_followers=100,
+            follows_per_user=10, images=0.02
+        )
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Замеряемых запросов на маршрут'
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--output', help='Файл для JSON с результатами; иначе stdout'
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для поиска регрессий'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('Нужен хотя бы один запрос на маршрут')
+        seed_options = self.seeder_options(options)
+        with benchmark.benchmark_environment():
+            report = benchmark.run(
+                requests=options['requests'],
+                warmup=options['warmup'],
+                **seed_options
+            )
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(data)
+        else:
+            self.stdout.write(data)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+            for row in benchmark.compare(baseline, report):
+                self.stderr.write(
+                    '{route} ({audience}): p50 {p50_ms[0]} → {p50_ms[1]} мс, '
+                    'запросов {queries[0]} → {queries[1]}'.format(**row)
+                )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.cache.fake_redis import FakeRedisServer
+
+
+class Command(BaseCommand):
+    help = 'Запускает встроенный сервер с протоколом Redis для общего кэша'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=6379)
+
+    def handle(self, *args, **options):
+        server = FakeRedisServer(options['host'], options['port'])
+        self.stdout.write(f'Кэш-сервер слушает {server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,81 @@
+import multiprocessing
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import Worker
+
+
+def serve(threads, poll_interval, burst):
+    """Запускает threads обработчиков в текущем процессе и ждёт их."""
+    stop = threading.Event()
+
+    def work():
+        Worker().run(stop, poll_interval, burst)
+
+    workers = [
+        threading.Thread(target=work, name=f'job-worker-{number}')
+        for number in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            # join с таймаутом, чтобы Ctrl+C доходил до главного потока.
+            while worker.is_alive():
+                worker.join(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи очереди core.jobs в пуле потоков и процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOB_WORKER_THREADS,
+            help='Обработчиков в каждом процессе'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+            help='Процессов с обработчиками'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Завершиться, когда очередь опустеет'
+        )
+
+    def handle(self, *args, **options):
+        arguments = (
+            options['threads'], options['poll_interval'], options['burst']
+        )
+        self.stdout.write(
+            f'Обработчиков: {options["processes"]} x {options["threads"]}'
+        )
+        if options['processes'] <= 1:
+            serve(*arguments)
+            return
+        # Соединения родителя не должны достаться дочерним процессам.
+        connections.close_all()
+        # fork: дочерний процесс получает настроенный Django и задачи.
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=serve, args=arguments)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
@@ -0,0 +1,86 @@
+import json
+import logging
+
+from django.conf import settings
+
+from .db import routers
+from .queries import QueryRecorder
+
+query_logger = logging.getLogger('yatube.queries')
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы каждого запроса и сверяет их с бюджетом вида.
+
+    Бюджеты задаются в settings.QUERY_BUDGETS: по имени URL — для GET
+    и HEAD, по паре (имя URL, метод) — для остальных методов. Статистика
+    пишется в лог ``yatube.queries`` (превышения бюджета — с уровнем
+    WARNING и без DEBUG), в режиме DEBUG — ещё и в заголовок ответа, а
+    тестам доступна как ``response.query_stats``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        stats = recorder.stats
+        response.query_stats = stats
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        budget = settings.QUERY_BUDGETS.get(
+            view_name if request.method in ('GET', 'HEAD')
+            else (view_name, request.method)
+        )
+        record = {
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'budget': budget,
+            **stats.as_dict(),
+        }
+        level = logging.INFO
+        if budget is not None and stats.count > budget:
+            level = logging.WARNING
+        query_logger.log(level, json.dumps(record, ensure_ascii=False))
+
+        if settings.DEBUG:
+            response['X-Query-Stats'] = (
+                'count={count}; time={time_ms}ms; duplicates={duplicates}'
+                .format(**stats.as_dict())
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Чтения лент с реплик и закрепление писавших за основной базой.
+
+    Виды из settings.REPLICA_VIEWS читают с реплик (core.db.routers).
+    После запроса с записью ответ ставит cookie REPLICA_PIN_COOKIE на
+    REPLICA_PIN_SECONDS: пока она есть, пользователь читает только из
+    основной базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routers.routing() as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and request.resolver_match.view_name in settings.REPLICA_VIEWS
+                and settings.REPLICA_PIN_COOKIE not in request.COOKIES):
+            routers.replica_reads()
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField(verbose_name='Письмо (JSON)')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных попыток')),
+                ('locked_by', models.CharField(blank=True, max_length=32, verbose_name='Пачка')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Взято в отправку')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Письмо',
+                'verbose_name_plural': 'Исходящие письма',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='send_after',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Отправить не раньше'),
+        ),
+    ]
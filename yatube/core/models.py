@@ -0,0 +1,116 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Отложенная задача очереди core.jobs."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    task = models.CharField(max_length=200, verbose_name='Задача')
+    args = models.TextField(default='[]', verbose_name='Аргументы (JSON)')
+    kwargs = models.TextField(
+        default='{}',
+        verbose_name='Именованные аргументы (JSON)'
+    )
+    priority = models.SmallIntegerField(default=0, verbose_name='Приоритет')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Состояние'
+    )
+    key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        verbose_name='Ключ для схлопывания повторов'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Попыток не больше'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить не раньше'
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Обработчик'
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Создана')
+
+    class Meta:
+        ordering = ('-priority', 'run_at', 'id')
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at', 'id'],
+                name='job_queue_idx'
+            ),
+        ]
+        # Задача с ключом стоит в очереди не больше одного раза; уже
+        # выполняемая не мешает поставить следующую.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='queued'),
+                name='unique-queued-job-key'
+            )
+        ]
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Очередь задач'
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
+
+
+class OutboundEmail(models.Model):
+    """Письмо в очереди отправки core.mail."""
+
+    message = models.TextField(verbose_name='Письмо (JSON)')
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Неудачных попыток'
+    )
+    locked_by = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name='Пачка'
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взято в отправку'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    send_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Отправить не раньше'
+    )
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'Письмо #{self.pk}'
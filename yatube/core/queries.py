@@ -0,0 +1,59 @@
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+
+
+class QueryStats:
+    """Число SQL-запросов, их суммарное время и повторы."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.signatures = Counter()
+
+    @property
+    def duplicates(self):
+        """Запросы (без параметров), выполненные больше одного раза."""
+        return {
+            sql: count for sql, count in self.signatures.items() if count > 1
+        }
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'time_ms': round(self.time * 1000, 2),
+            'duplicates': sum(self.duplicates.values()),
+        }
+
+
+class QueryRecorder:
+    """Контекстный менеджер, считающий запросы ко всем базам.
+
+    with QueryRecorder() as recorder:
+        ...
+    recorder.stats.count
+    """
+
+    def __init__(self):
+        self.stats = QueryStats()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats.time += time.perf_counter() - start
+            self.stats.count += 1
+            self.stats.signatures[sql] += 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
@@ -0,0 +1,177 @@
+"""Ограничение частоты запросов скользящим окном.
+
+Счётчики хранятся в кэше settings.RATELIMIT_CACHE по фиксированным
+окнам, а число запросов за последние window секунд оценивается по
+текущему окну и доле предыдущего, ещё попадающей в скользящее:
+
+    previous * (1 - elapsed / window) + current
+
+Проверка стоит одного get_many на все правила и одного incr на
+правило, сколько бы запросов ни было в окне. Запрос сверх лимита не
+считается и получает 429 с Retry-After — через столько секунд оценка
+опустится настолько, что следующий запрос пройдёт.
+
+Правила для имён URL задаются в settings.RATELIMITS и применяются
+RateLimitMiddleware, для отдельных видов есть декоратор ratelimit().
+Правило — вид ключа и частота: 'user' считает запросы пользователя,
+а гостя — по адресу; 'ip' — запросы с адреса клиента (см.
+client_address). Частота записывается как '10/m' или '100/5m'
+(единицы s, m, h, d).
+"""
+import math
+import time
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'100/5m' -> (100, 300): лимит и окно в секундах."""
+    count, period = rate.split('/')
+    return int(count), int(period[:-1] or 1) * UNITS[period[-1]]
+
+
+def client_address(request):
+    """Адрес клиента, от которого пришёл запрос.
+
+    Это REMOTE_ADDR, если только он не из
+    settings.RATELIMIT_TRUSTED_PROXIES: тогда клиент — последний адрес
+    X-Forwarded-For, не принадлежащий доверенным прокси. Адреса левее
+    подставляет сам клиент, и верить им нельзя.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    trusted = settings.RATELIMIT_TRUSTED_PROXIES
+    if address not in trusted:
+        return address
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+    for hop in reversed([hop.strip() for hop in forwarded if hop.strip()]):
+        address = hop
+        if hop not in trusted:
+            break
+    return address
+
+
+def _identity(request, kind):
+    if kind == 'user' and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_address(request)}'
+
+
+def _estimate(previous, current, elapsed, window):
+    return previous * (1 - elapsed / window) + current
+
+
+def _retry_after(previous, current, elapsed, limit, window):
+    """Секунды, через которые оценка станет не больше limit - 1."""
+    target = limit - 1
+    weight = 1 - elapsed / window
+    excess = previous * weight + current - target
+    # До конца окна убывает только вклад предыдущего.
+    if previous and excess <= previous * weight:
+        seconds = excess * window / previous
+    else:
+        # Затем текущее окно становится предыдущим и убывает само.
+        seconds = window - elapsed
+        if current > target:
+            seconds += window * (1 - target / current)
+    return max(math.ceil(seconds), 1)
+
+
+def check(request, scope, rates):
+    """Учитывает запрос по правилам rates ({вид ключа: частота}).
+
+    Возвращает None, если запрос укладывается в лимиты, иначе — через
+    сколько секунд повторить; такой запрос не учитывается.
+    """
+    cache = caches[settings.RATELIMIT_CACHE]
+    now = time.time()
+    rules = []
+    for kind, rate in rates.items():
+        limit, window = parse_rate(rate)
+        bucket, elapsed = divmod(now, window)
+        prefix = (
+            f'ratelimit:{scope}:{kind}:{_identity(request, kind)}:{window}:'
+        )
+        rules.append((
+            limit, window, elapsed,
+            f'{prefix}{int(bucket)}', f'{prefix}{int(bucket) - 1}'
+        ))
+    counts = cache.get_many(
+        [key for *_, current, previous in rules
+         for key in (current, previous)]
+    )
+    waits = []
+    for limit, window, elapsed, current, previous in rules:
+        current, previous = counts.get(current, 0), counts.get(previous, 0)
+        if _estimate(previous, current, elapsed, window) + 1 > limit:
+            waits.append(
+                _retry_after(previous, current, elapsed, limit, window)
+            )
+    if waits:
+        return max(waits)
+    for limit, window, elapsed, current, previous in rules:
+        # Счётчик живёт два окна: в следующем он станет предыдущим.
+        if current in counts or not cache.add(current, 1, 2 * window):
+            try:
+                cache.incr(current)
+            except ValueError:
+                cache.add(current, 1, 2 * window)
+    return None
+
+
+def limited(request, scope, rates, methods=UNSAFE_METHODS):
+    """Ответ 429, если запрос сверх лимитов rates, иначе None."""
+    if not settings.RATELIMIT_ENABLED or request.method not in methods:
+        return None
+    retry_after = check(request, scope, rates)
+    if retry_after is None:
+        return None
+    # Импорт здесь: core.views тянет шаблоны.
+    from .views import too_many_requests
+    return too_many_requests(request, retry_after)
+
+
+def ratelimit(methods=UNSAFE_METHODS, **rates):
+    """Декоратор вида: ratelimit(user='10/m', ip='30/m')."""
+    def decorator(view):
+        scope = f'{view.__module__}.{view.__qualname__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = limited(request, scope, rates, methods)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return response
+        return wrapper
+    return decorator
+
+
+class RateLimitMiddleware:
+    """Применяет правила settings.RATELIMITS по имени URL вида.
+
+    Правило — словарь {вид ключа: частота}; ключ 'methods' задаёт
+    учитываемые методы, по умолчанию — изменяющие данные.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        policy = settings.RATELIMITS.get(view_name)
+        if policy is None:
+            return None
+        rates = {
+            kind: rate for kind, rate in policy.items() if kind != 'methods'
+        }
+        return limited(
+            request, view_name, rates, policy.get('methods', UNSAFE_METHODS)
+        )
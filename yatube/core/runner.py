@@ -0,0 +1,28 @@
+"""Окружение тестов.
+
+Общий кэш по умолчанию — файл SQLite: он переживает прогон, и
+следующий прогон получил бы страницы и версии лент прежней тестовой
+базы. Поэтому тесты работают с общим кэшем в памяти процесса.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def local_caches():
+    """override_settings с общим кэшем в памяти процесса."""
+    return override_settings(CACHES={
+        **settings.CACHES,
+        'shared': settings.SHARED_CACHES['locmem'],
+    })
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.caches = local_caches()
+        self.caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,24 @@
+from . import mail
+from .jobs import PRIORITY_HIGH, task
+
+
+@task(priority=PRIORITY_HIGH, key=lambda: 'flush-outbox')
+def flush_outbox():
+    """Отправляет пачку писем и ставит себя снова, пока они остаются.
+
+    Если остались только отложенные после ошибки письма, отправку
+    разбудит retry_outbox, когда подойдёт их срок: ждущая flush_outbox
+    с тем же ключом задержала бы и новые письма.
+    """
+    mail.flush()
+    wait = mail.next_flush_in()
+    if wait == 0:
+        flush_outbox.delay()
+    elif wait is not None:
+        retry_outbox.enqueue(countdown=wait)
+
+
+@task(priority=PRIORITY_HIGH, key=lambda: 'retry-outbox')
+def retry_outbox():
+    """Отправляет письма, отложенные после ошибки."""
+    flush_outbox()
@@ -1,6 +1,38 @@
+import logging
+import shutil
+import tempfile
+import threading
+import time
+from smtplib import SMTPRecipientsRefused
+from datetime import timedelta
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import (
+    EmailBackend as LocMemEmailBackend
+)
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.template import engines
+from django.template.loaders.filesystem import Loader as FileSystemLoader
+from django.urls import reverse
+from django.utils import timezone
+
+from core import benchmark, jobs, mail as spool, warmup
+from core.cache.backends import RedisCache, SQLiteCache, TieredCache
+from core.cache.fake_redis import FakeRedisServer
+from core.db.backends.sqlite3.base import DatabaseWrapper
+from core.models import Job, OutboundEmail
+from core.ratelimit import ratelimit
+from posts.models import Post, Profile, User
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +40,754 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class QueryBudgetMiddlewareTest(TestCase):
+    def test_stats_are_logged_and_attached_to_response(self):
+        with self.assertLogs('yatube.queries', level='INFO') as logs:
+            response = self.client.get('/')
+        self.assertGreaterEqual(response.query_stats.count, 1)
+        self.assertIn('"view": "posts:index"', logs.output[0])
+        self.assertNotIn('X-Query-Stats', response)
+
+    def test_only_budget_warnings_are_emitted_without_debug(self):
+        handlers = logging.getLogger('yatube.queries').handlers
+
+        def emitted(level):
+            record = logging.LogRecord(
+                'yatube.queries', level, __file__, 0, '{}', None, None
+            )
+            return any(
+                level >= handler.level and handler.filter(record)
+                for handler in handlers
+            )
+
+        self.assertTrue(emitted(logging.WARNING))
+        self.assertFalse(emitted(logging.INFO))
+
+    @override_settings(DEBUG=True)
+    def test_stats_header_in_debug(self):
+        response = self.client.get('/')
+        self.assertIn(
+            f'count={response.query_stats.count};',
+            response['X-Query-Stats']
+        )
+
+
+class BenchmarkTest(TestCase):
+    def test_every_route_is_measured(self):
+        report = benchmark.run(
+            requests=2, warmup=0, seed=1, users=5, groups=2, posts=20,
+            celebrities=1, celebrity_followers=3, images=0
+        )
+        measured = {
+            (row['route'], row['audience']) for row in report['results']
+        }
+        self.assertIn(('posts:post_detail', 'anonymous'), measured)
+        self.assertIn(('users:password_reset_confirm', 'authenticated'),
+                      measured)
+        self.assertEqual(len(measured), len(report['results']))
+        row = report['results'][0]
+        self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+        self.assertGreater(row['alloc_kib'], 0)
+        self.assertEqual(report['meta']['dataset']['posts'], 20)
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(100, 0, -1))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile(values, 1), 100)
+        self.assertEqual(benchmark.percentile([1, 2], 0.5), 1)
+        self.assertEqual(benchmark.percentile([7], 0.99), 7)
+        self.assertEqual(benchmark.percentile([3, 1, 2], 0), 1)
+
+    def test_compare_reports_regressions(self):
+        def report(p50_ms, queries):
+            return {'results': [{
+                'route': 'posts:index', 'audience': 'anonymous',
+                'p50_ms': p50_ms, 'queries': queries,
+            }]}
+
+        self.assertEqual(benchmark.compare(report(10, 3), report(11, 3)), [])
+        self.assertEqual(
+            len(benchmark.compare(report(10, 3), report(10, 4))), 1
+        )
+        self.assertEqual(
+            len(benchmark.compare(report(10, 3), report(13, 3))), 1
+        )
+
+
+class SharedCacheContractMixin:
+    """Общие проверки для бэкендов общего кэша."""
+
+    def test_get_set_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_add_does_not_overwrite(self):
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+
+    def test_incr(self):
+        self.cache.set('counter', 10, None)
+        self.assertEqual(self.cache.incr('counter'), 11)
+        self.assertEqual(self.cache.incr('counter', 5), 16)
+        self.assertEqual(self.cache.get('counter'), 16)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expiry(self):
+        self.cache.set('short', 'value', 0.05)
+        self.assertTrue(self.cache.has_key('short'))
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+        self.cache.set('zero', 'value', 0)
+        self.assertIsNone(self.cache.get('zero'))
+
+    def test_clear(self):
+        self.cache.set('key', 'value')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+
+class SQLiteCacheTest(SharedCacheContractMixin, SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(f'{self.directory}/cache.sqlite3', {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class RedisCacheTest(SharedCacheContractMixin, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = RedisCache(self.server.url, {})
+        self.cache.clear()
+
+    def test_clients_share_data(self):
+        other = RedisCache(self.server.url, {})
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        self.assertEqual(other.get_many(['key', 'missing']), {'key': 'value'})
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.params = {
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'L1_TIMEOUT': 60,
+                'L1_BYPASS_PREFIXES': ['version:'],
+            },
+        }
+        self.cache = TieredCache('test', self.params)
+        self.cache.clear()
+
+    def test_values_are_served_from_local_tier(self):
+        self.cache.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_shared_values_are_copied_to_local_tier(self):
+        caches['shared'].set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.local.get('key'), 'value')
+
+    def test_version_keys_bypass_local_tier(self):
+        other_worker = TieredCache('other', self.params)
+        self.cache.set('version:feed', 1, None)
+        self.assertEqual(other_worker.get('version:feed'), 1)
+        other_worker.incr('version:feed')
+        self.assertEqual(self.cache.get('version:feed'), 2)
+        self.assertIsNone(self.cache.local.get('version:feed'))
+
+
+class DatabaseProfileTest(SimpleTestCase):
+    """Бэкенды core.db: PRAGMA SQLite, пул и проверка соединений."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def wrapper(self, alias, **options):
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': f'{self.directory}/{alias}.sqlite3',
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False,
+            'POOL_SIZE': 0,
+            **options,
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_pragmas(self):
+        wrapper = self.wrapper('pragmas')
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        # 1 — NORMAL.
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+
+    def test_pool_reuses_connections(self):
+        wrapper = self.wrapper('pool', POOL_SIZE=1)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        other = self.wrapper('pool', POOL_SIZE=1)
+        other.ensure_connection()
+        self.assertIsNot(other.connection, raw)
+
+    def test_dead_pooled_connection_is_replaced(self):
+        wrapper = self.wrapper('dead', POOL_SIZE=1)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        raw.close()
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+
+    def test_health_check_closes_unusable_connection(self):
+        wrapper = self.wrapper('health', CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.is_usable = lambda: False
+        # Новое соединение до следующего запроса не проверяется.
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        wrapper.reset_health_check()
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    PAGE_CACHE_TIMEOUT=0,
+    SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'
+)
+class ReplicaRoutingTest(TestCase):
+    """Ленты читаются с реплики, писавший читает из основной базы."""
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # Реплика — отдельная пустая база, которая нужна только здесь.
+        connections.databases['replica'] = {
+            **settings.DATABASES['default'], 'NAME': 'replica', 'TEST': {}
+        }
+        connections['replica'].creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].creation.destroy_test_db(
+            'replica', verbosity=0
+        )
+        del connections.databases['replica']
+        delattr(connections._connections, 'replica')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        # Реплика отстаёт: на ней есть автор, но нет его поста.
+        User.objects.using('replica').bulk_create([
+            User(pk=cls.author.pk, username='author')
+        ])
+        Profile.objects.using('replica').bulk_create([
+            Profile(user_id=cls.author.pk)
+        ])
+        Post.objects.create(author=cls.author, text='Пост не на реплике')
+
+    def setUp(self):
+        self.author_client = self.client_class()
+        self.author_client.force_login(self.author)
+
+    @override_settings(FEED_CACHE_TIMEOUT=0)
+    def test_feeds_are_read_from_replica(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Пост не на реплике')
+        with self.settings(DATABASE_REPLICAS=[]):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост не на реплике')
+
+    def test_writer_is_pinned_to_primary(self):
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}
+        )
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        # Гость первым собирает ленту по реплике, но его фрагменты
+        # закреплённому автору не достаются.
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Свежий пост')
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_lagging_replica_render_is_not_cached(self):
+        post = Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Свежий пост')
+        # Реплика догоняет основную базу.
+        Post.objects.using('replica').bulk_create([
+            Post(pk=post.pk, author_id=self.author.pk, text=post.text)
+        ])
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_reads_do_not_pin(self):
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+CALLS = []
+
+
+@jobs.task(name='tests.record', key=lambda value: f'record:{value}')
+def record(value):
+    CALLS.append(value)
+
+
+@jobs.task(name='tests.urgent', priority=jobs.PRIORITY_HIGH)
+def urgent(value):
+    CALLS.append(value)
+
+
+@jobs.task(name='tests.broken', max_attempts=2)
+def broken():
+    raise ValueError('сломано')
+
+
+@override_settings(JOBS_EAGER=False)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        self.worker = jobs.Worker('test')
+
+    def test_delay_persists_job(self):
+        job = record.delay('a')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(job.task, 'tests.record')
+        self.assertTrue(self.worker.run_once())
+        self.assertEqual(CALLS, ['a'])
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(self.worker.run_once())
+
+    def test_key_collapses_waiting_jobs(self):
+        first = record.delay('a')
+        self.assertEqual(record.delay('a').pk, first.pk)
+        record.delay('b')
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_priority_and_countdown(self):
+        record.delay('normal')
+        urgent.delay('urgent')
+        record.enqueue(['later'], countdown=60)
+        while self.worker.run_once():
+            pass
+        self.assertEqual(CALLS, ['urgent', 'normal'])
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+    def test_failed_job_is_retried_then_kept(self):
+        job = broken.delay()
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('сломано', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertFalse(self.worker.run_once())
+
+    def test_retry_delay_is_capped(self):
+        self.assertEqual(jobs.retry_delay(1), settings.JOB_RETRY_DELAY)
+        self.assertEqual(jobs.retry_delay(2), settings.JOB_RETRY_DELAY * 2)
+        self.assertEqual(
+            jobs.retry_delay(100), settings.JOB_RETRY_MAX_DELAY
+        )
+
+    def test_stale_job_is_requeued(self):
+        job = record.delay('a')
+        self.assertEqual(self.worker.claim().pk, job.pk)
+        self.assertEqual(jobs.requeue_stale(), 0)
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(
+                seconds=settings.JOB_TIMEOUT + 1
+            )
+        )
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertTrue(self.worker.run_once())
+        self.assertEqual(CALLS, ['a'])
+
+    def test_stale_job_without_attempts_fails(self):
+        job = record.delay('a')
+        Job.objects.filter(pk=job.pk).update(attempts=job.max_attempts - 1)
+        self.worker.claim()
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(
+                seconds=settings.JOB_TIMEOUT + 1
+            )
+        )
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.last_error, jobs.WORKER_LOST)
+        self.assertFalse(self.worker.run_once())
+        self.assertEqual(CALLS, [])
+
+    def test_burst_worker_drains_queue(self):
+        for value in 'abc':
+            record.delay(value)
+        self.worker.run(threading.Event(), poll_interval=0, burst=True)
+        self.assertEqual(sorted(CALLS), ['a', 'b', 'c'])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        self.assertIsNone(record.delay('a'))
+        self.assertEqual(CALLS, ['a'])
+        self.assertFalse(Job.objects.exists())
+
+
+class BrokenBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('почтовый сервер недоступен')
+
+
+class RefusingBackend(LocMemEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if 'r0@example.com' in message.recipients():
+                raise SMTPRecipientsRefused({'r0@example.com': (550, b'')})
+        return super().send_messages(email_messages)
+
+
+@override_settings(
+    JOBS_EAGER=False,
+    EMAIL_BACKEND='core.mail.SpoolBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_BATCH_SIZE=2
+)
+class MailSpoolTest(TestCase):
+    def setUp(self):
+        self.worker = jobs.Worker('test')
+
+    def spool(self, count):
+        get_connection().send_messages([
+            EmailMultiAlternatives(
+                f'Письмо {number}', 'Текст', to=[f'r{number}@example.com']
+            )
+            for number in range(count)
+        ])
+
+    def test_message_survives_encoding(self):
+        message = EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            cc=['cc@example.com'], reply_to=['reply@example.com'],
+            headers={'X-Digest': 'daily'}
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        decoded = spool.decode(spool.encode(message))
+        for name in ('subject', 'body', 'from_email', 'to', 'cc', 'bcc',
+                     'reply_to', 'extra_headers', 'alternatives',
+                     'attachments'):
+            self.assertEqual(
+                getattr(decoded, name), getattr(message, name), name
+            )
+
+    def test_batches_share_one_job(self):
+        self.spool(5)
+        self.assertEqual(OutboundEmail.objects.count(), 5)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Job.objects.get().task, 'core.tasks.flush_outbox')
+        with mock.patch.object(
+            mail.get_connection(
+                'django.core.mail.backends.locmem.EmailBackend'
+            ).__class__, 'open', autospec=True
+        ) as opened:
+            while self.worker.run_once():
+                pass
+        self.assertEqual(len(mail.outbox), 5)
+        # Пачки по EMAIL_BATCH_SIZE, одно соединение на пачку.
+        self.assertEqual(opened.call_count, 3)
+        self.assertFalse(OutboundEmail.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='core.tests.BrokenBackend')
+    def test_failed_delivery_keeps_messages(self):
+        self.spool(2)
+        self.assertTrue(self.worker.run_once())
+        for email in OutboundEmail.objects.all():
+            self.assertEqual(email.attempts, 1)
+            self.assertIn('недоступен', email.last_error)
+            self.assertEqual(email.locked_by, '')
+            self.assertGreater(email.send_after, timezone.now())
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'core.tasks.retry_outbox')
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertFalse(self.worker.run_once())
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='core.tests.RefusingBackend')
+    def test_refused_message_does_not_block_others(self):
+        self.spool(3)
+        while self.worker.run_once():
+            pass
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [['r1@example.com'], ['r2@example.com']]
+        )
+        refused = OutboundEmail.objects.get()
+        self.assertEqual(refused.attempts, 1)
+        self.assertIn('r0@example.com', refused.last_error)
+        # Новое письмо не ждёт срока отложенного.
+        get_connection().send_messages([
+            EmailMultiAlternatives('Сброс', 'Текст', to=['new@example.com'])
+        ])
+        self.assertTrue(self.worker.run_once())
+        self.assertEqual(mail.outbox[-1].to, ['new@example.com'])
+        for _ in range(settings.JOB_MAX_ATTEMPTS - 2):
+            OutboundEmail.objects.update(send_after=timezone.now())
+            Job.objects.update(run_at=timezone.now())
+            self.assertTrue(self.worker.run_once())
+        OutboundEmail.objects.update(send_after=timezone.now())
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.mail', 'ERROR'):
+            self.assertTrue(self.worker.run_once())
+        refused.refresh_from_db()
+        self.assertEqual(refused.attempts, settings.JOB_MAX_ATTEMPTS)
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_password_reset_is_spooled(self):
+        User.objects.create_user(
+            username='reader', email='r@example.com', password='secret'
+        )
+        self.client.post(
+            reverse('users:password_reset_form'), {'email': 'r@example.com'}
+        )
+        self.assertEqual(mail.outbox, [])
+        self.worker.run_once()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['r@example.com'])
+
+
+@override_settings(
+    RATELIMIT_ENABLED=True,
+    RATELIMITS={
+        'users:login': {'ip': '2/m'},
+        'posts:add_comment': {'user': '2/m', 'ip': '3/m'},
+        'posts:profile_follow': {'methods': ('GET',), 'user': '1/m'},
+    }
+)
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        caches[settings.RATELIMIT_CACHE].clear()
+        self.clock = mock.patch('core.ratelimit.time.time', return_value=600)
+        self.now = self.clock.start()
+        self.addCleanup(self.clock.stop)
+
+    def login(self, address='10.0.0.1'):
+        return self.client.post(
+            reverse('users:login'), {'username': 'x', 'password': 'y'},
+            REMOTE_ADDR=address
+        )
+
+    def comment(self, user, address='10.0.0.1'):
+        self.client.force_login(user)
+        return self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'}, REMOTE_ADDR=address
+        )
+
+    def test_over_limit_gets_429(self):
+        self.assertEqual(self.login().status_code, HTTPStatus.OK)
+        self.assertEqual(self.login().status_code, HTTPStatus.OK)
+        response = self.login()
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTemplateUsed(response, 'core/429.html')
+        # Запросы текущего окна начнут убывать только в следующем.
+        self.assertEqual(response['Retry-After'], '90')
+        self.assertEqual(self.login('10.0.0.2').status_code, HTTPStatus.OK)
+        self.assertEqual(
+            self.client.get(reverse('users:login')).status_code,
+            HTTPStatus.OK
+        )
+
+    def test_window_slides(self):
+        self.login()
+        self.login()
+        # Середина следующего окна: в оценке половина прошлых запросов.
+        self.now.return_value = 690
+        self.assertEqual(self.login().status_code, HTTPStatus.OK)
+        response = self.login()
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.now.return_value = 720
+        self.assertEqual(self.login().status_code, HTTPStatus.OK)
+
+    def test_user_and_ip_keys(self):
+        for _ in range(2):
+            self.assertEqual(self.comment(self.reader).status_code, 302)
+        self.assertEqual(
+            self.comment(self.reader, '10.0.0.9').status_code,
+            HTTPStatus.TOO_MANY_REQUESTS
+        )
+        self.assertEqual(self.comment(self.author).status_code, 302)
+        self.assertEqual(
+            self.comment(self.author).status_code,
+            HTTPStatus.TOO_MANY_REQUESTS
+        )
+        self.assertEqual(self.post.comments.count(), 3)
+
+    def test_policy_methods(self):
+        self.client.force_login(self.reader)
+        url = reverse('posts:profile_follow', args=['author'])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.TOO_MANY_REQUESTS
+        )
+
+    def test_decorator(self):
+        view = ratelimit(ip='1/h')(lambda request: HttpResponse('ok'))
+        factory = RequestFactory()
+        request = factory.post('/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).status_code, HTTPStatus.OK)
+        response = view(request)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '6600')
+        request = factory.get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).status_code, HTTPStatus.OK)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxy(self):
+        self.assertEqual(self.login().status_code, HTTPStatus.OK)
+        self.assertEqual(self.login().status_code, HTTPStatus.OK)
+        response = self.client.post(
+            reverse('users:login'), {'username': 'x', 'password': 'y'},
+            REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='10.0.0.2'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    @override_settings(RATELIMIT_TRUSTED_PROXIES=['10.0.0.1', '10.0.0.3'])
+    def test_clients_behind_trusted_proxy(self):
+        def login(forwarded):
+            return self.client.post(
+                reverse('users:login'), {'username': 'x', 'password': 'y'},
+                REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded
+            )
+
+        self.assertEqual(login('1.1.1.1').status_code, HTTPStatus.OK)
+        # Левый адрес подставлен клиентом, правый — доверенный прокси.
+        self.assertEqual(
+            login('9.9.9.9, 1.1.1.1, 10.0.0.3').status_code, HTTPStatus.OK
+        )
+        self.assertEqual(
+            login('1.1.1.1').status_code, HTTPStatus.TOO_MANY_REQUESTS
+        )
+        self.assertEqual(login('2.2.2.2').status_code, HTTPStatus.OK)
+        self.assertEqual(self.login().status_code, HTTPStatus.OK)
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, HTTPStatus.OK)
+
+
+def templates_setting(directory, profile):
+    return [{
+        **settings.TEMPLATES[0],
+        'DIRS': [directory],
+        'OPTIONS': {
+            **settings.TEMPLATES[0]['OPTIONS'],
+            'loaders': settings.TEMPLATE_PROFILES[profile],
+        },
+    }]
+
+
+class TemplateWarmUpTest(TestCase):
+    """Профиль production компилирует шаблоны один раз, до запросов."""
+
+    def test_first_request_does_not_read_templates(self):
+        with self.settings(TEMPLATES=templates_setting(
+            settings.TEMPLATES_DIR, 'production'
+        )):
+            self.assertGreater(warmup.warm_up(), 30)
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertIn('posts/index.html', loader.get_template_cache)
+            with mock.patch.object(
+                FileSystemLoader, 'get_contents'
+            ) as get_contents:
+                response = self.client.get(reverse('posts:index'))
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            get_contents.assert_not_called()
+
+    def test_development_profile_rereads_templates(self):
+        with self.settings(TEMPLATES=templates_setting(
+            settings.TEMPLATES_DIR, 'development'
+        )):
+            warmup.warm_up()
+            with mock.patch.object(
+                FileSystemLoader, 'get_contents', autospec=True,
+                side_effect=FileSystemLoader.get_contents
+            ) as get_contents:
+                self.client.get(reverse('posts:index'))
+            get_contents.assert_called()
+
+    def test_broken_templates_are_logged(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with open(f'{directory}/links.html', 'w') as stream:
+            stream.write(
+                '{% if x %}{% url "posts:index" %}{% endif %}'
+                '{% url "posts:missing" %}{% url "nowhere:index" %}'
+                '{% url name %}'
+            )
+        with open(f'{directory}/broken.html', 'w') as stream:
+            stream.write('{% if %}')
+        with self.settings(TEMPLATES=templates_setting(
+            directory, 'production'
+        )), self.assertLogs('core.warmup') as logs:
+            self.assertEqual(warmup.warm_up(), 1)
+        output = '\n'.join(logs.output)
+        self.assertIn('broken.html', output)
+        self.assertIn('posts:missing', output)
+        self.assertIn('nowhere:index', output)
+        self.assertNotIn('WARNING:core.warmup:posts:index', output)
@@ -0,0 +1,71 @@
+"""Компиляция шаблонов до первого запроса.
+
+warm_up() загружает каждый шаблон из каталогов DIRS движков Django,
+и кэширующий загрузчик (профиль шаблонов production) сохраняет его
+скомпилированным: первые запросы после выкладки не разбирают шаблоны.
+Для имён URL из {% url %} заранее строятся таблицы обратного
+разрешения корневого резолвера и резолверов пространств имён, а
+имена, которых нет ни в одном urls.py, попадают в лог.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.defaulttags import URLNode
+from django.urls import NoReverseMatch, get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def _template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            yield os.path.relpath(
+                os.path.join(root, name), directory
+            ).replace(os.sep, '/')
+
+
+def url_names(template):
+    """Имена URL, заданные строкой в тегах {% url %} шаблона."""
+    return {
+        node.view_name.var
+        for node in template.nodelist.get_nodes_by_type(URLNode)
+        if isinstance(node.view_name.var, str)
+    }
+
+
+def resolve_url_name(name):
+    """Строит таблицы резолверов для имени вида 'posts:index'."""
+    resolver = get_resolver()
+    *namespaces, view = name.split(':')
+    for namespace in namespaces:
+        if namespace not in resolver.namespace_dict:
+            raise NoReverseMatch(f'Нет пространства имён {namespace}')
+        resolver = resolver.namespace_dict[namespace][1]
+    if view not in resolver.reverse_dict:
+        raise NoReverseMatch(f'Нет URL с именем {name}')
+
+
+def warm_up():
+    """Компилирует шаблоны и готовит URL; возвращает число шаблонов."""
+    names, urls = 0, set()
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for directory in backend.engine.dirs:
+            for name in _template_names(directory):
+                try:
+                    template = backend.engine.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Шаблон %s не компилируется', name)
+                    continue
+                names += 1
+                urls |= url_names(template)
+    for name in sorted(urls):
+        try:
+            resolve_url_name(name)
+        except NoReverseMatch as error:
+            logger.warning('%s: %s', name, error)
+    logger.info('Скомпилировано шаблонов: %s, имён URL: %s', names, len(urls))
+    return names
@@ -0,0 +1,27 @@
+"""Время последнего изменения страниц для заголовка Last-Modified.
+
+Post.updated и Group.last_activity обновляются сами при сохранении
+модели (auto_now). Здесь их сдвигают события, которые меняют страницу,
+не сохраняя саму модель: комментарии, посты группы и автора, подписки.
+"""
+from django.utils import timezone
+
+from .models import Group, Post, Profile
+
+
+def touch_post(post_id):
+    Post.objects.filter(pk=post_id).update(updated=timezone.now())
+
+
+def touch_groups(*group_ids):
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    if group_ids:
+        Group.objects.filter(pk__in=group_ids).update(
+            last_activity=timezone.now()
+        )
+
+
+def touch_profile(user_id):
+    Profile.objects.filter(user_id=user_id).update(
+        last_activity=timezone.now()
+    )
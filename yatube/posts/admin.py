@@ -1,6 +1,18 @@
 from django.contrib import admin
 
-from .models import Follow, Group, Post
+from . import tasks
+from .models import Follow, Group, ImageDerivative, Post, Profile
+
+
+class ImageDerivativeInline(admin.TabularInline):
+    model = ImageDerivative
+    fields = ('file', 'format', 'width', 'height')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +27,12 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    inlines = (ImageDerivativeInline,)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            tasks.build_image_derivatives.delay(obj.pk)
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -29,6 +47,27 @@ class FollowAdmin(admin.ModelAdmin):
     search_fields = ('user', 'author')
 
 
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'posts_count',
+        'comments_count',
+        'followers_count',
+        'following_count',
+        'digest',
+    )
+    list_filter = ('digest',)
+    search_fields = ('user__username',)
+    readonly_fields = (
+        'posts_count',
+        'comments_count',
+        'followers_count',
+        'following_count',
+        'digest_sent_at',
+    )
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Profile, ProfileAdmin)
@@ -0,0 +1,93 @@
+"""Условные GET для страниц поста, профиля и группы.
+
+Last-Modified берётся из отметок времени моделей (см. posts.activity),
+ETag — из них же, версии ленты, адреса и пользователя. Проверка
+валидатора стоит одного запроса вместо выборки и рендера страницы.
+Авторизованным отдаётся только ETag: в странице есть имя пользователя
+и CSRF-токен, а время изменения от пользователя не зависит.
+"""
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.db.models.functions import Greatest
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import feed_cache, groups
+from .models import Post, Profile
+
+
+def conditional_page(last_modified, scope):
+    """Условный GET для вида с временем изменения last_modified(**kwargs).
+
+    last_modified возвращает None, если объекта нет: тогда вид
+    выполняется как обычно. scope(**kwargs) — лента, чья версия входит
+    в ETag. Cache-Control задаётся settings.PAGE_CACHE_CONTROL.
+    """
+
+    def get_last_modified(request, **kwargs):
+        if not hasattr(request, '_page_last_modified'):
+            request._page_last_modified = last_modified(**kwargs)
+        return request._page_last_modified
+
+    def get_anonymous_last_modified(request, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        return get_last_modified(request, **kwargs)
+
+    def get_etag(request, **kwargs):
+        modified = get_last_modified(request, **kwargs)
+        # ETag по новой версии нельзя выдавать вместе с данными отстающей
+        # реплики: клиент получал бы 304 на устаревшую страницу.
+        if modified is None or not feed_cache.cacheable(*scope(**kwargs)):
+            return None
+        key = ':'.join(str(part) for part in (
+            request.get_full_path(),
+            modified.isoformat(),
+            feed_cache.feed_version(*scope(**kwargs)),
+            request.user.pk,
+        ))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=get_etag,
+            last_modified_func=get_anonymous_last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            response = conditional_view(request, **kwargs)
+            if response.status_code in (HTTPStatus.OK,
+                                        HTTPStatus.NOT_MODIFIED):
+                audience = (
+                    'authenticated' if request.user.is_authenticated
+                    else 'anonymous'
+                )
+                patch_cache_control(
+                    response, **settings.PAGE_CACHE_CONTROL[audience]
+                )
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def post_modified(post_id):
+    """Пост, его комментарии и счётчик постов автора в боковой панели."""
+    return Post.objects.filter(pk=post_id).annotate(
+        modified=Greatest('updated', 'author__profile__last_activity')
+    ).values_list('modified', flat=True).first()
+
+
+def profile_modified(username):
+    return Profile.objects.filter(user__username=username).values_list(
+        'last_activity', flat=True
+    ).first()
+
+
+def group_modified(slug):
+    group = groups.registry().get(slug)
+    return group.last_activity if group is not None else None
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+def change_counter(queryset, field, delta):
+    """Атомарно сдвигает счётчик field у записей queryset на delta."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    queryset.update(**{field: F(field) + delta})
+
+
+def _count(queryset, field, outer='pk'):
+    """Подзапрос: число строк queryset, у которых field равно OuterRef."""
+    counted = queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+        field
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+@transaction.atomic
+def recount():
+    """Пересчитывает все денормализованные счётчики по исходным таблицам."""
+    Profile.objects.bulk_create(
+        Profile(user=user)
+        for user in User.objects.filter(profile__isnull=True)
+    )
+    Profile.objects.update(
+        posts_count=_count(Post.objects.all(), 'author', 'user'),
+        comments_count=_count(Comment.objects.all(), 'author', 'user'),
+        followers_count=_count(Follow.objects.all(), 'author', 'user'),
+        following_count=_count(Follow.objects.all(), 'user', 'user'),
+    )
+    Group.objects.update(posts_count=_count(Post.objects.all(), 'group'))
+    Post.objects.update(
+        comments_count=_count(Comment.objects.all(), 'post')
+    )
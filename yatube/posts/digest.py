@@ -0,0 +1,114 @@
+"""Письма с новыми постами авторов, на которых подписан читатель.
+
+Читатели с выбранной частотой (Profile.digest) обходятся пачками по
+DIGEST_BATCH_SIZE; посты для всей пачки берутся одним запросом по
+графу подписок Follow, а письма уходят в очередь почты одним вызовом
+send_messages. Письмо охватывает посты с прошлой отправки, но не
+старше одного периода; в него попадают последние DIGEST_POSTS постов.
+Команда ``manage.py send_digests hourly|daily`` запускается по cron.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Follow, Profile
+
+PERIODS = {
+    Profile.DIGEST_HOURLY: timedelta(hours=1),
+    Profile.DIGEST_DAILY: timedelta(days=1),
+}
+
+
+def _readers(period):
+    return Profile.objects.filter(digest=period).exclude(
+        user__email=''
+    ).order_by('user_id').values_list(
+        'user_id', 'user__username', 'user__email', 'digest_sent_at'
+    )
+
+
+def _posts(readers, since, now):
+    """Новые посты подписок по читателям: {user_id: [пост, ...]}."""
+    rows = Follow.objects.filter(
+        user_id__in=list(readers),
+        author__posts__pub_date__gt=min(since.values()),
+        author__posts__pub_date__lte=now
+    ).order_by('user_id', '-author__posts__pub_date').values_list(
+        'user_id', 'author__username', 'author__posts__pk',
+        'author__posts__text', 'author__posts__pub_date'
+    )
+    posts = defaultdict(list)
+    for user_id, author, post_id, text, pub_date in rows.iterator():
+        if pub_date <= since[user_id]:
+            continue
+        posts[user_id].append({
+            'author': author,
+            'text': text,
+            'pub_date': pub_date,
+            'url': settings.SITE_URL + reverse(
+                'posts:post_detail', args=(post_id,)
+            ),
+        })
+    return posts
+
+
+def _message(username, email, posts):
+    context = {
+        'username': username,
+        'posts': posts[:settings.DIGEST_POSTS],
+        'more': max(len(posts) - settings.DIGEST_POSTS, 0),
+        'follow_url': settings.SITE_URL + reverse('posts:follow_index'),
+        'settings_url': settings.SITE_URL + reverse('users:digest'),
+    }
+    subject = render_to_string('posts/email/digest_subject.txt', context)
+    message = EmailMultiAlternatives(
+        ''.join(subject.splitlines()),
+        render_to_string('posts/email/digest.txt', context),
+        to=[email]
+    )
+    message.attach_alternative(
+        render_to_string('posts/email/digest.html', context), 'text/html'
+    )
+    return message
+
+
+def _send_batch(batch, period, now, connection):
+    since = {
+        user_id: max(sent_at or now - period, now - period)
+        for user_id, _, _, sent_at in batch
+    }
+    posts = _posts(since.keys(), since, now)
+    messages = [
+        _message(username, email, posts[user_id])
+        for user_id, username, email, _ in batch
+        if posts[user_id]
+    ]
+    connection.send_messages(messages)
+    Profile.objects.filter(user_id__in=list(since)).update(
+        digest_sent_at=now
+    )
+    return len(messages)
+
+
+def send(period, now=None, batch_size=None):
+    """Ставит в очередь письма читателям с частотой period.
+
+    Возвращает число писем.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+    connection = get_connection()
+    batch, sent = [], 0
+    for reader in _readers(period).iterator(batch_size):
+        batch.append(reader)
+        if len(batch) >= batch_size:
+            sent += _send_batch(batch, PERIODS[period], now, connection)
+            batch = []
+    if batch:
+        sent += _send_batch(batch, PERIODS[period], now, connection)
+    return sent
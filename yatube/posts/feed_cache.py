@@ -0,0 +1,77 @@
+"""Версии лент для ключей кэша.
+
+Фрагменты лент кэшируются под ключом, включающим версию ленты.
+Сигналы увеличивают версию при изменении постов и групп, поэтому
+старые фрагменты перестают запрашиваться сразу, без ожидания TTL.
+
+Реплика может ещё не видеть изменения, ради которого увеличили
+версию, поэтому собранное по реплике в первые REPLICA_PIN_SECONDS
+после увеличения под новой версией не кэшируется (cacheable()).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db import routers
+
+GLOBAL_SCOPE = ('all',)
+
+
+def _key(scope):
+    return 'feed-version:' + ':'.join(str(part) for part in scope)
+
+
+def _bumped_key(scope):
+    return 'feed-bumped:' + ':'.join(str(part) for part in scope)
+
+
+def _initial_version():
+    # Версия, созданная заново после вытеснения ключа из кэша,
+    # не должна совпасть с версией ещё живых старых фрагментов.
+    return int(time.time() * 1000)
+
+
+def get_version(*scope):
+    key = _key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*scope):
+    key = _key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+    if settings.DATABASE_REPLICAS:
+        cache.set(_bumped_key(scope), True, settings.REPLICA_PIN_SECONDS)
+
+
+def feed_version(*scope):
+    """Версия ленты scope с учётом общей версии всех лент."""
+    return f'{get_version(*GLOBAL_SCOPE)}.{get_version(*scope)}'
+
+
+def cacheable(*scope):
+    """Можно ли сохранить собранное сейчас под версией ленты scope.
+
+    Проверять после чтения данных: если версию увеличили раньше, чем
+    прошло REPLICA_PIN_SECONDS, реплика могла отдать данные до изменения.
+    """
+    if not routers.reading_from_replica():
+        return True
+    return not cache.get_many([_bumped_key(GLOBAL_SCOPE), _bumped_key(scope)])
+
+
+def feed_cache_context(*scope):
+    return {
+        'feed_version': feed_version(*scope),
+        # Ноль: {% cache %} отрисует фрагмент, но не сохранит его.
+        'feed_cache_timeout': (
+            settings.FEED_CACHE_TIMEOUT if cacheable(*scope) else 0
+        ),
+    }
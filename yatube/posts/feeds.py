@@ -0,0 +1,159 @@
+"""RSS и Atom для общей ленты, групп и авторов.
+
+Готовый XML кэшируется под версией ленты (см. posts.feed_cache):
+сигналы увеличивают её, только когда меняются посты этой ленты, и
+лишь тогда ленту собирают заново. Вместе с XML хранятся ETag (хэш
+содержимого) и Last-Modified, поэтому подписчику, у которого лента
+не менялась, 304 отдаётся по двум обращениям к кэшу, без запросов к
+базе.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.html import linebreaks
+from django.utils.http import parse_http_date_safe, quote_etag
+from django.utils.text import Truncator
+from django.views.decorators.http import require_safe
+
+from . import feed_cache, groups
+from .models import Post, User
+
+FEED_TYPES = {'rss': Rss201rev2Feed, 'atom': Atom1Feed}
+
+
+class PostsFeed(Feed):
+    """Общая лента: последние settings.FEED_ITEMS постов."""
+
+    title = 'Yatube: последние обновления'
+    description = 'Новые записи всех авторов'
+
+    def scope(self):
+        """Лента posts.feed_cache, чья версия сбрасывает кэш XML."""
+        return ('index',)
+
+    def link(self, obj):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).select_related(
+            'author', 'group'
+        ).order_by('-pub_date', '-id')[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).chars(60)
+
+    def item_description(self, item):
+        return linebreaks(item.text, autoescape=True)
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupFeed(PostsFeed):
+
+    def scope(self, slug):
+        return ('group', slug)
+
+    def get_object(self, request, slug):
+        return groups.get_group_or_404(slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_posts', args=[group.slug])
+
+    def posts(self, group):
+        return Post.objects.filter(group_id=group.pk)
+
+
+class ProfileFeed(PostsFeed):
+
+    def scope(self, username):
+        return ('profile', username)
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи автора {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def posts(self, author):
+        return Post.objects.filter(author_id=author.pk)
+
+
+def feed_view(feed_class, feed_format):
+    """Вид ленты feed_class в формате feed_format ('rss' или 'atom')."""
+    feed = type(
+        f'{feed_class.__name__}{feed_format.title()}',
+        (feed_class,),
+        {'feed_type': FEED_TYPES[feed_format]}
+    )()
+
+    @require_safe
+    @wraps(feed)
+    def view(request, **kwargs):
+        version = feed_cache.feed_version(*feed.scope(**kwargs))
+        key = 'feed:{}:{}'.format(
+            version, hashlib.md5(request.get_full_path().encode()).hexdigest()
+        )
+        cached = cache.get(key)
+        if cached is None:
+            response = feed(request, **kwargs)
+            cached = (
+                response.content,
+                response['Content-Type'],
+                quote_etag(hashlib.md5(response.content).hexdigest()),
+                response.get('Last-Modified'),
+            )
+            if feed_cache.cacheable(*feed.scope(**kwargs)):
+                cache.set(key, cached, settings.FEED_CACHE_TIMEOUT)
+        content, content_type, etag, last_modified = cached
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=parse_http_date_safe(last_modified or '')
+        )
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = last_modified
+        patch_cache_control(
+            response, **settings.PAGE_CACHE_CONTROL['anonymous']
+        )
+        return response
+
+    return view
@@ -1,10 +1,16 @@
 from django import forms
 
-from .models import Comment, Post
+from . import groups
+from .models import Comment, Group, Post, User
 
 
 class PostForm(forms.ModelForm):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['group']
+        field.choices = lambda: groups.choices(field)
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -23,3 +29,27 @@ class CommentForm(forms.ModelForm):
         fields = ('text',)
         labels = {'text': 'Комметарий'}
         help_texts = {'text': 'Напишите Ваш комментарий'}
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200)
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+        empty_label='Все группы',
+        label='Группа'
+    )
+    author = forms.ModelChoiceField(
+        queryset=User.objects.all(),
+        to_field_name='username',
+        required=False,
+        widget=forms.TextInput,
+        label='Автор',
+        error_messages={'invalid_choice': 'Такого автора нет'}
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['group']
+        field.choices = lambda: groups.choices(field, 'slug')
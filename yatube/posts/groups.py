@@ -0,0 +1,50 @@
+"""Реестр групп: все группы одним значением кэша.
+
+Групп немного, а нужны они почти везде: страница группы ищет её по
+slug, формы выводят список для выбора, каталог и боковая панель
+сортируют по активности. Реестр — словарь slug → Group в порядке
+последней активности вместе со счётчиками постов; строится одним
+запросом и кэшируется под версией ленты ('groups',). Версию сбрасывают
+сигналы: сохранение и удаление групп (через общую версию всех лент) и
+изменения постов в группах, которые сдвигают счётчики и активность.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from . import feed_cache
+from .models import Group
+
+SCOPE = ('groups',)
+
+
+def registry():
+    key = f'group-registry:{feed_cache.feed_version(*SCOPE)}'
+    groups = cache.get(key)
+    if groups is None:
+        groups = {
+            group.slug: group
+            for group in Group.objects.order_by('-last_activity', 'title')
+        }
+        if feed_cache.cacheable(*SCOPE):
+            cache.set(key, groups, settings.FEED_CACHE_TIMEOUT)
+    return groups
+
+
+def get_group_or_404(slug):
+    group = registry().get(slug)
+    if group is None:
+        raise Http404('Группа не найдена.')
+    return group
+
+
+def choices(field, to_field_name='pk'):
+    """Варианты для ModelChoiceField с группами, без запроса к базе."""
+    groups = sorted(registry().values(), key=lambda group: group.title)
+    return [
+        ('', field.empty_label),
+        *(
+            (getattr(group, to_field_name), field.label_from_instance(group))
+            for group in groups
+        ),
+    ]
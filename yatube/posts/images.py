@@ -0,0 +1,110 @@
+"""Производные картинок постов: несколько ширин в нескольких форматах.
+
+Производные строятся один раз после сохранения поста фоновой задачей
+(posts.tasks.build_image_derivatives) и записываются в модель
+ImageDerivative. Шаблоны берут их из prefetch_related('derivatives')
+и до готовности показывают оригинал: рендер страницы никогда не ждёт
+Pillow. Когда производные готовы,
+версии лент с этим постом увеличиваются, и закэшированные фрагменты
+с оригиналом перестают отдаваться.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import activity, feed_cache
+from .models import ImageDerivative, Post
+
+FALLBACK_FORMAT = 'JPEG'
+EXTENSIONS = {'JPEG': 'jpg'}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 6},
+    'AVIF': {'quality': 60},
+}
+
+
+def available_formats():
+    """Форматы из POST_IMAGE_FORMATS, которые умеет сохранять Pillow.
+
+    JPEG есть всегда: он нужен для <img> у браузеров без новых форматов.
+    """
+    Image.init()
+    formats = [
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in Image.SAVE
+    ]
+    if FALLBACK_FORMAT not in formats:
+        formats.append(FALLBACK_FORMAT)
+    return formats
+
+
+def _sizes(image):
+    """Размеры кадра POST_IMAGE_CROP для всех ширин, что даёт картинка."""
+    crop_width, crop_height = settings.POST_IMAGE_CROP
+    max_width = min(image.width, image.height * crop_width / crop_height)
+    widths = [
+        width for width in settings.POST_IMAGE_WIDTHS if width <= max_width
+    ] or [min(settings.POST_IMAGE_WIDTHS)]
+    return [(width, round(width * crop_height / crop_width))
+            for width in widths]
+
+
+def _render(post):
+    with post.image.storage.open(post.image.name) as source:
+        image = ImageOps.exif_transpose(Image.open(source)).convert('RGB')
+    name, _ = os.path.splitext(os.path.basename(post.image.name))
+    stem = f'{post.pk}_{name}'
+    formats = available_formats()
+    for width, height in _sizes(image):
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for image_format in formats:
+            buffer = BytesIO()
+            resized.save(
+                buffer, image_format, **SAVE_OPTIONS.get(image_format, {})
+            )
+            extension = EXTENSIONS.get(image_format, image_format.lower())
+            derivative = ImageDerivative(
+                post=post,
+                source=post.image.name,
+                format=image_format,
+                width=width,
+                height=height
+            )
+            derivative.file.save(
+                f'{stem}_{width}.{extension}',
+                ContentFile(buffer.getvalue()),
+                save=False
+            )
+            yield derivative
+
+
+def generate(post_id):
+    """Строит производные картинки поста, если их ещё нет.
+
+    Возвращает False, если производные для текущей картинки уже есть.
+    """
+    post = Post.objects.select_related('author', 'group').get(pk=post_id)
+    old = list(post.derivatives.all())
+    sources = {derivative.source for derivative in old}
+    if sources == ({post.image.name} if post.image else set()):
+        return False
+    derivatives = list(_render(post)) if post.image else []
+    with transaction.atomic():
+        post.derivatives.all().delete()
+        ImageDerivative.objects.bulk_create(derivatives)
+    for derivative in old:
+        derivative.file.delete(save=False)
+    activity.touch_post(post.pk)
+    activity.touch_profile(post.author_id)
+    activity.touch_groups(post.group_id)
+    feed_cache.bump_version('index')
+    feed_cache.bump_version('post', post.pk)
+    feed_cache.bump_version('profile', post.author.username)
+    if post.group is not None:
+        feed_cache.bump_version('group', post.group.slug)
+    return True
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import export_posts
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл выгрузки; по умолчанию stdout'
+        )
+
+    def handle(self, *args, path, **options):
+        if path == '-':
+            count = export_posts(self.stdout)
+            self.stderr.write(f'Выгружено записей: {count}')
+            return
+        with open(path, 'w', encoding='utf-8') as stream:
+            count = export_posts(stream)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено записей: {count}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import tasks
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Ставит в очередь построение производных картинок постов'
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image='').values_list(
+            'pk', flat=True
+        )
+        count = 0
+        for post_id in post_ids.iterator():
+            tasks.build_image_derivatives.delay(post_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Поставлено в очередь: {count}; производные строит run_workers'
+        ))
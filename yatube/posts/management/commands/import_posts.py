@@ -0,0 +1,60 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import Importer
+
+
+def read_checkpoint(path):
+    """Номер последней загруженной строки из контрольной точки."""
+    with open(path) as stream:
+        return json.load(stream)['line']
+
+
+def write_checkpoint(path, line_number):
+    # Через временный файл: оборванная запись не портит прежнюю точку.
+    with open(f'{path}.tmp', 'w') as stream:
+        json.dump({'line': line_number}, stream)
+    os.replace(f'{path}.tmp', path)
+
+
+class Command(BaseCommand):
+    help = 'Загружает выгрузку export_posts пачками через bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки JSONL')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Записей в одной транзакции'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; если он есть, импорт '
+                 'продолжается с сохранённой строки'
+        )
+
+    def handle(self, *args, path, batch_size, checkpoint, **options):
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        start_line = 0
+        if checkpoint and os.path.exists(checkpoint):
+            start_line = read_checkpoint(checkpoint)
+            self.stdout.write(f'Продолжаем со строки {start_line + 1}')
+
+        def save_checkpoint(line_number):
+            if checkpoint:
+                write_checkpoint(checkpoint, line_number)
+
+        importer = Importer(batch_size, save_checkpoint)
+        try:
+            with open(path, encoding='utf-8') as stream:
+                loaded = importer.load(stream, start_line)
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Некорректная выгрузка: {error}')
+        importer.rebuild()
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {loaded}'
+        ))
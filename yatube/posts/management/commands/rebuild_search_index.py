@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        search.get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересобран'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок всех пользователей'
+
+    def handle(self, *args, **options):
+        timeline.rebuild()
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны'))
@@ -0,0 +1,93 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import EPOCH, Seeder
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, постами, '
+            'комментариями и подписками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--comments-per-post', type=float, default=3,
+            help='Среднее число комментариев к посту'
+        )
+        parser.add_argument(
+            '--follows-per-user', type=float, default=20,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--celebrities', type=int, default=3,
+            help='Сколько самых активных авторов получат массу подписчиков'
+        )
+        parser.add_argument('--celebrity-followers', type=int, default=100000)
+        parser.add_argument(
+            '--images', type=float, default=0.1,
+            help='Доля постов с картинкой'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона активности авторов'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты постов'
+        )
+        parser.add_argument(
+            '--epoch', default=EPOCH.isoformat(),
+            help='Дата и время последнего поста, ISO 8601; по умолчанию '
+                 'постоянные, чтобы --seed воспроизводил данные'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Префикс имён пользователей и адресов групп'
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики, ленты, индекс и картинки'
+        )
+
+    def seeder_options(self, options):
+        """Параметры Seeder из аргументов команды."""
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError('Нужны хотя бы один пользователь и пачка')
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images — доля от 0 до 1')
+        epoch = options['epoch']
+        if isinstance(epoch, str):
+            try:
+                epoch = dt.datetime.fromisoformat(epoch)
+            except ValueError:
+                raise CommandError('--epoch — дата в формате ISO 8601')
+        if epoch.tzinfo is None:
+            epoch = epoch.replace(tzinfo=dt.timezone.utc)
+        return dict(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments_per_post=options['comments_per_post'],
+            follows_per_user=options['follows_per_user'],
+            celebrities=options['celebrities'],
+            celebrity_followers=options['celebrity_followers'],
+            images=options['images'],
+            alpha=options['alpha'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            epoch=epoch,
+        )
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            **self.seeder_options(options), log=self.stdout.write
+        )
+        seeder.run(derived=not options['skip_derived'])
+        self.stdout.write(self.style.SUCCESS('База заполнена'))
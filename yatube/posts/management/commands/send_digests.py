@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import digest
+
+
+class Command(BaseCommand):
+    help = 'Ставит в очередь письма с новыми постами подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', choices=sorted(digest.PERIODS))
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        sent = digest.send(
+            options['period'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Писем в очереди: {sent}'))
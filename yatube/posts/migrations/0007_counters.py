@@ -0,0 +1,72 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field, outer='pk'):
+    counted = queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+        field
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Profile = apps.get_model('posts', 'Profile')
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Profile.objects.bulk_create(
+        Profile(user_id=user_id)
+        for user_id in User.objects.values_list('pk', flat=True)
+    )
+    Profile.objects.update(
+        posts_count=_count(Post.objects.all(), 'author', 'user'),
+        comments_count=_count(Comment.objects.all(), 'author', 'user'),
+        followers_count=_count(Follow.objects.all(), 'author', 'user'),
+        following_count=_count(Follow.objects.all(), 'user', 'user'),
+    )
+    Group.objects.update(posts_count=_count(Post.objects.all(), 'group'))
+    Post.objects.update(comments_count=_count(Comment.objects.all(), 'post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0006_auto_20211004_2023'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число комментариев'),
+        ),
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Число комментариев')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль',
+                'verbose_name_plural': 'Профили',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
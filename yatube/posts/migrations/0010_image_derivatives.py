@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100, verbose_name='Исходная картинка')),
+                ('file', models.ImageField(upload_to='posts/derivatives/', verbose_name='Файл')),
+                ('format', models.CharField(max_length=10, verbose_name='Формат')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Производная картинки',
+                'verbose_name_plural': 'Производные картинок',
+                'ordering': ('post', 'format', 'width'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='imagederivative',
+            constraint=models.UniqueConstraint(fields=('post', 'format', 'width'), name='unique-derivative-post-format-width'),
+        ),
+    ]
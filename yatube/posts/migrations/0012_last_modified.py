@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def fill_updated(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_activity',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Последнее изменение'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Последнее изменение'),
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+    ]
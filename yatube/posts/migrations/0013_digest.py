@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_last_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='digest',
+            field=models.CharField(blank=True, choices=[('', 'Не присылать'), ('hourly', 'Раз в час'), ('daily', 'Раз в день')], default='', max_length=10, verbose_name='Письмо с новыми постами подписок'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='digest_sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Письмо с новыми постами отправлено'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedPost',
+            fields=[
+                ('source_pk', models.PositiveIntegerField(primary_key=True, serialize=False, verbose_name='pk в выгрузке')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Импортированный пост',
+                'verbose_name_plural': 'Импортированные посты',
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -8,6 +9,14 @@ class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='Заглавие')
     slug = models.SlugField(max_length=50, unique=True, verbose_name='URL')
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+    last_activity = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Последнее изменение'
+    )
 
     def __str__(self):
         return self.title
@@ -22,6 +31,10 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -41,9 +54,27 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число комментариев'
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -71,6 +102,15 @@ class Comment(models.Model):
         verbose_name='Дата публикации комментария'
     )
 
+    class Meta:
+        ordering = ('pub_date', 'id')
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date', 'id'],
+                name='comment_post_pub_date_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text[:15]
 
@@ -94,6 +134,174 @@ class Follow(models.Model):
                 name='unique-follower-author'
             )
         ]
+        # Индекс (user, author) даёт уникальное ограничение выше,
+        # обратный нужен для выборки подписчиков автора.
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class Profile(models.Model):
+    DIGEST_OFF = ''
+    DIGEST_HOURLY = 'hourly'
+    DIGEST_DAILY = 'daily'
+    DIGEST_CHOICES = (
+        (DIGEST_OFF, 'Не присылать'),
+        (DIGEST_HOURLY, 'Раз в час'),
+        (DIGEST_DAILY, 'Раз в день'),
+    )
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число комментариев'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок'
+    )
+    last_activity = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Последнее изменение'
+    )
+    digest = models.CharField(
+        max_length=10,
+        choices=DIGEST_CHOICES,
+        default=DIGEST_OFF,
+        blank=True,
+        verbose_name='Письмо с новыми постами подписок'
+    )
+    digest_sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Письмо с новыми постами отправлено'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return f'Профиль {self.user}'
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок пользователя, заполняется при публикации."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique-timeline-user-post'
+            )
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class ImageDerivative(models.Model):
+    """Уменьшенная копия картинки поста одной ширины в одном формате."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='derivatives',
+        verbose_name='Пост'
+    )
+    source = models.CharField(
+        max_length=100,
+        verbose_name='Исходная картинка'
+    )
+    file = models.ImageField(
+        upload_to='posts/derivatives/',
+        verbose_name='Файл'
+    )
+    format = models.CharField(max_length=10, verbose_name='Формат')
+    width = models.PositiveIntegerField(verbose_name='Ширина')
+    height = models.PositiveIntegerField(verbose_name='Высота')
+
+    class Meta:
+        ordering = ('post', 'format', 'width')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'format', 'width'],
+                name='unique-derivative-post-format-width'
+            )
+        ]
+        verbose_name = 'Производная картинки'
+        verbose_name_plural = 'Производные картинок'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.format} {self.width}x{self.height}'
+
+    @property
+    def mime_type(self):
+        return f'image/{self.format.lower()}'
+
+
+class ImportedPost(models.Model):
+    """Пост, загруженный import_posts, и его pk в выгрузке.
+
+    Хранится, пока идёт импорт: по нему комментарии находят свои посты.
+    """
+
+    source_pk = models.PositiveIntegerField(
+        primary_key=True,
+        verbose_name='pk в выгрузке'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        verbose_name = 'Импортированный пост'
+        verbose_name_plural = 'Импортированные посты'
+
+    def __str__(self):
+        return f'{self.source_pk} -> {self.post_id}'
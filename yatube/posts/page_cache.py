@@ -0,0 +1,205 @@
+"""Кэш целых страниц с поздно заполняемыми персональными фрагментами.
+
+Всё, что зависит от пользователя (шапка, вкладки ленты, кнопка
+подписки, форма комментария), шаблоны выводят тегом {% late %}: вместо
+фрагмента в страницу попадает метка. Такая «оболочка» одинакова для
+всех, и LateFragmentMiddleware кэширует её целиком, а метки заполняет
+для текущего пользователя — это несколько маленьких шаблонов вместо
+выборки и рендера всей страницы.
+
+AnonymousPageCacheMiddleware стоит раньше сессий, CSRF и
+аутентификации и отдаёт гостям (без cookie сессии) готовую страницу,
+не выполняя ни одного запроса к базе.
+
+Кэшируются виды из settings.PAGE_CACHE_VIEWS. Ключ включает адрес с
+параметрами и версию ленты вида (см. posts.feed_cache), поэтому
+сигналы, меняющие версии, сбрасывают и эти страницы. TTL
+settings.PAGE_CACHE_TIMEOUT ограничивает устаревание того, что в
+версию не входит, например счётчика постов автора на странице поста.
+"""
+import base64
+import hashlib
+import json
+import re
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import parse_http_date_safe, quote_etag
+
+from . import feed_cache
+
+MARKER = re.compile(rb'<!--late:(\w+):([\w-]*)-->')
+# Заголовки оболочки; остальные (валидаторы, Cache-Control) зависят
+# от пользователя и выставляются заново.
+SHELL_HEADERS = ('Content-Type', 'Content-Language')
+
+
+def marker(name, kwargs):
+    """Метка фрагмента name с параметрами kwargs (значения JSON)."""
+    data = json.dumps(kwargs, sort_keys=True, separators=(',', ':'))
+    payload = base64.urlsafe_b64encode(data.encode()).rstrip(b'=')
+    return f'<!--late:{name}:{payload.decode()}-->'
+
+
+def _render_fragment(request, match):
+    template = settings.LATE_FRAGMENTS.get(match.group(1).decode())
+    if template is None:
+        return b''
+    payload = match.group(2) + b'=' * (-len(match.group(2)) % 4)
+    try:
+        kwargs = json.loads(base64.urlsafe_b64decode(payload))
+    except ValueError:
+        return b''
+    return render_to_string(template, kwargs, request=request).encode()
+
+
+def fill(request, content):
+    """Заменяет метки фрагментами, отрисованными для request.user."""
+    if b'<!--late:' not in content:
+        return content
+    return MARKER.sub(
+        lambda match: _render_fragment(request, match), content
+    )
+
+
+def _is_html(response):
+    return (
+        not response.streaming
+        and response.get('Content-Type', '').startswith('text/html')
+    )
+
+
+def page_key(prefix, request):
+    """Ключ страницы или None, если её нельзя брать из кэша."""
+    if (request.method not in ('GET', 'HEAD')
+            or not settings.PAGE_CACHE_TIMEOUT):
+        return None
+    # Только что писавший пользователь читает из основной базы (см.
+    # core.db.routers), а страницу с новой версией мог положить в кэш
+    # тот, кто читал с отстающей реплики.
+    if settings.REPLICA_PIN_COOKIE in request.COOKIES:
+        return None
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+    if match.view_name not in settings.PAGE_CACHE_VIEWS:
+        return None
+    request.resolver_match = match
+    version = feed_cache.feed_version(*_scope(request))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{prefix}:{version}:{path}'
+
+
+def _scope(request):
+    match = request.resolver_match
+    return tuple(
+        part.format(**match.kwargs)
+        for part in settings.PAGE_CACHE_VIEWS[match.view_name]
+    )
+
+
+def _storable(request, response):
+    """Можно ли положить в кэш ответ на запрос с ключом page_key()."""
+    return (
+        request.method == 'GET'
+        and response.status_code == HTTPStatus.OK
+        and feed_cache.cacheable(*_scope(request))
+    )
+
+
+def _from_cache(request, content, headers):
+    response = HttpResponse(content)
+    for header, value in headers:
+        response[header] = value
+    response['X-Page-Cache'] = 'hit'
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+        response=response
+    ) or response
+
+
+class AnonymousPageCacheMiddleware:
+    """Готовые страницы для гостей, до сессий и аутентификации."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = None
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            key = page_key('page', request)
+        if key is None:
+            return self.get_response(request)
+        cached = cache.get(key)
+        if cached is not None:
+            return _from_cache(request, *cached)
+        response = self.get_response(request)
+        if (_storable(request, response)
+                and _is_html(response)
+                and not response.cookies
+                and 'private' not in response.get('Cache-Control', '')):
+            cache.set(
+                key,
+                (response.content, list(response.items())),
+                settings.PAGE_CACHE_TIMEOUT
+            )
+        return response
+
+
+class LateFragmentMiddleware:
+    """Заполняет метки {% late %} и кэширует оболочки страниц.
+
+    Стоит после AuthenticationMiddleware: фрагменты видят пользователя,
+    а CsrfViewMiddleware успевает выставить cookie для форм в них.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = page_key('page-shell', request)
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            return self.serve_shell(request, *cached)
+        response = self.get_response(request)
+        if not _is_html(response):
+            return response
+        if key is not None and _storable(request, response):
+            cache.set(
+                key,
+                (response.content, [
+                    (header, response[header]) for header in SHELL_HEADERS
+                    if response.has_header(header)
+                ]),
+                settings.PAGE_CACHE_TIMEOUT
+            )
+        response.content = fill(request, response.content)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = len(response.content)
+        return response
+
+    def serve_shell(self, request, content, headers):
+        content = fill(request, content)
+        headers = [
+            *headers,
+            ('ETag', quote_etag(hashlib.md5(content).hexdigest())),
+        ]
+        response = _from_cache(request, content, headers)
+        audience = (
+            'authenticated' if request.user.is_authenticated
+            else 'anonymous'
+        )
+        patch_cache_control(response, **settings.PAGE_CACHE_CONTROL[audience])
+        patch_vary_headers(response, ('Cookie',))
+        return response
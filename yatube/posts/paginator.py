@@ -0,0 +1,233 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from types import MethodType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+DEFAULT_KEYS = ('-pub_date', '-id')
+# Комментарии идут от старых к новым.
+COMMENT_KEYS = ('pub_date', 'id')
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор по курсору (keyset) вместо LIMIT/OFFSET.
+
+    Страница ищется по индексу от значений ключей последней записи
+    предыдущей страницы, поэтому далёкие страницы стоят столько же,
+    сколько первая. Страницы не нумеруются: вместо номера у страницы
+    есть непрозрачные курсоры ``next_cursor`` и ``previous_cursor``.
+    """
+
+    def __init__(self, object_list, per_page, keys=DEFAULT_KEYS,
+                 count_timeout=None):
+        super().__init__(object_list, per_page)
+        self.keys = tuple(keys)
+        if count_timeout is None:
+            count_timeout = settings.PAGINATOR_COUNT_TIMEOUT
+        self.count_timeout = count_timeout
+
+    @cached_property
+    def count(self):
+        """Приблизительное число записей.
+
+        Точный COUNT(*) выполняется не чаще раза в ``count_timeout``
+        секунд для одного и того же запроса.
+        """
+        try:
+            query = str(self.object_list.query).encode()
+        except EmptyResultSet:
+            return 0
+        key = 'paginator-count:' + hashlib.md5(query).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    def get_page(self, cursor):
+        """Как page(), но при битом курсоре отдаёт первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor):
+        direction, values = NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        keys = self.keys
+        if direction == PREVIOUS:
+            keys = tuple(_reverse_key(key) for key in keys)
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._seek(keys, values))
+        items = list(queryset.order_by(*keys)[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction == PREVIOUS:
+            if not has_more:
+                # Дошли до начала ленты: показываем полную первую страницу.
+                return self.page(None)
+            items.reverse()
+            has_next, has_previous = True, True
+        else:
+            has_next, has_previous = has_more, values is not None
+        next_cursor = previous_cursor = None
+        if items and has_next:
+            next_cursor = self.encode_cursor(NEXT, items[-1])
+        if items and has_previous:
+            previous_cursor = self.encode_cursor(PREVIOUS, items[0])
+        return _keyset_page(
+            items, self, cursor or None, next_cursor, previous_cursor
+        )
+
+    def count_before(self, obj):
+        """Число записей перед obj в порядке сортировки ленты."""
+        keys = tuple(_reverse_key(key) for key in self.keys)
+        values = [getattr(obj, key.lstrip('-')) for key in self.keys]
+        return self.object_list.filter(self._seek(keys, values)).count()
+
+    def encode_cursor(self, direction, obj):
+        values = []
+        for key in self.keys:
+            value = getattr(obj, key.lstrip('-'))
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        data = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            data = base64.urlsafe_b64decode(cursor + padding)
+            direction, raw_values = json.loads(data.decode())
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(raw_values) != len(self.keys):
+                raise ValueError(raw_values)
+            values = [
+                self.object_list.model._meta.get_field(
+                    key.lstrip('-')
+                ).to_python(value)
+                for key, value in zip(self.keys, raw_values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor('Некорректный курсор страницы')
+        return direction, values
+
+    @staticmethod
+    def _seek(keys, values):
+        """Условие «строго после values» в порядке сортировки keys.
+
+        Нестрогая граница по первому ключу дублирует условие, но без неё
+        SQLite не использует OR-условие как диапазон индекса и проходит
+        индекс с самого начала.
+        """
+        condition = Q()
+        equal = {}
+        for key, value in zip(keys, values):
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first = keys[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
+
+
+def _keyset_page(items, paginator, cursor, next_cursor, previous_cursor):
+    """Страница без номера: соседние страницы задаются курсорами.
+
+    Остаётся обычным ``Page`` (шаблоны и тесты проверяют тип), но методы
+    навигации отвечают по курсорам: ``next_page_number()`` и
+    ``previous_page_number()`` возвращают курсор для ``?cursor=``.
+    ``cursor`` — проверенный курсор самой страницы, у первой — None.
+    """
+    page = Page(items, None, paginator)
+    page.cursor = cursor
+    page.next_cursor = next_cursor
+    page.previous_cursor = previous_cursor
+    for name, method in _PAGE_METHODS.items():
+        setattr(page, name, MethodType(method, page))
+    return page
+
+
+def _has_next(page):
+    return page.next_cursor is not None
+
+
+def _has_previous(page):
+    return page.previous_cursor is not None
+
+
+def _next_page_number(page):
+    if page.next_cursor is None:
+        raise EmptyPage('Это последняя страница')
+    return page.next_cursor
+
+
+def _previous_page_number(page):
+    if page.previous_cursor is None:
+        raise EmptyPage('Это первая страница')
+    return page.previous_cursor
+
+
+def _offset(page):
+    """Сколько записей стоит перед страницей.
+
+    На первой странице ноль без запросов, на остальных один COUNT по
+    диапазону индекса перед первой записью страницы.
+    """
+    if not page.has_previous() or not page.object_list:
+        return 0
+    if not hasattr(page, '_offset'):
+        page._offset = page.paginator.count_before(page.object_list[0])
+    return page._offset
+
+
+def _start_index(page):
+    if not page.object_list:
+        return 0
+    return _offset(page) + 1
+
+
+def _end_index(page):
+    return _offset(page) + len(page.object_list)
+
+
+_PAGE_METHODS = {
+    'has_next': _has_next,
+    'has_previous': _has_previous,
+    'next_page_number': _next_page_number,
+    'previous_page_number': _previous_page_number,
+    'start_index': _start_index,
+    'end_index': _end_index,
+}
+
+
+def _reverse_key(key):
+    return key[1:] if key.startswith('-') else '-' + key
+
+
+def paginate(request, object_list, per_page=None, keys=DEFAULT_KEYS):
+    """Страница ленты по параметру ``?cursor=`` запроса."""
+    paginator = KeysetPaginator(
+        object_list,
+        per_page or settings.POSTS_PER_PAGE,
+        keys=keys
+    )
+    return paginator.get_page(request.GET.get('cursor'))
@@ -0,0 +1,292 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Бэкенд выбирается настройкой SEARCH_BACKEND. FTS5SearchBackend держит
+инвертированный индекс в виртуальных таблицах SQLite FTS5 (их создаёт
+миграция), SimpleSearchBackend работает с любой базой, но ищет через
+LIKE. Индекс обновляется сигналами при сохранении и удалении постов
+и комментариев; команда rebuild_search_index пересобирает его целиком.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+ELLIPSIS = '…'
+SNIPPET_TOKENS = 16
+SNIPPET_CHARS = 120
+TOKEN = re.compile(r'\w+')
+
+_backends = {}
+
+
+def tokenize(query):
+    return TOKEN.findall(query.lower())
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и превращает метки совпадений в <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Ленивая выдача для Paginator: count() и срезы идут в бэкенд.
+
+    Посты страницы загружаются одним запросом; у каждого есть
+    ``snippet`` — фрагмент текста с подсвеченными совпадениями.
+    """
+
+    def __init__(self, backend, query, group_id=None, author_id=None):
+        self.backend = backend
+        self.query = query
+        self.filters = {'group_id': group_id, 'author_id': author_id}
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query, **self.filters)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        hits = self.backend.hits(
+            self.query, offset, index.stop - offset, **self.filters
+        )
+        posts = Post.objects.select_related(
+            'author', 'group'
+        ).prefetch_related('derivatives').in_bulk(
+            [post_id for post_id, _ in hits]
+        )
+        results = []
+        for post_id, snippet in hits:
+            post = posts.get(post_id)
+            if post is not None:
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
+
+
+class BaseSearchBackend:
+    """Интерфейс бэкенда поиска.
+
+    Методы индексации по умолчанию ничего не делают: бэкенду без
+    собственного индекса достаточно реализовать count() и hits().
+    """
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_comment(self, comment_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def count(self, query, group_id=None, author_id=None):
+        raise NotImplementedError
+
+    def hits(self, query, offset, limit, group_id=None, author_id=None):
+        """Список пар (id поста, фрагмент с метками), лучшие первыми."""
+        raise NotImplementedError
+
+    def search(self, query, group_id=None, author_id=None):
+        return SearchResults(self, query, group_id, author_id)
+
+
+class FTS5SearchBackend(BaseSearchBackend):
+    """Индекс SQLite FTS5 с ранжированием bm25.
+
+    Совпадение в тексте поста весит больше, чем в комментарии к нему.
+    Каждое слово запроса ищется как префикс: «пост» найдёт «посты».
+    """
+
+    posts_table = 'posts_search_post'
+    comments_table = 'posts_search_comment'
+    comment_weight = 0.5
+
+    def _execute(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def match(self, query):
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def index_post(self, post):
+        self.remove_post(post.pk)
+        self._execute(
+            f'INSERT INTO {self.posts_table} (rowid, text) VALUES (%s, %s)',
+            (post.pk, post.text)
+        )
+
+    def remove_post(self, post_id):
+        self._execute(
+            f'DELETE FROM {self.posts_table} WHERE rowid = %s', (post_id,)
+        )
+
+    def index_comment(self, comment):
+        self.remove_comment(comment.pk)
+        self._execute(
+            f'INSERT INTO {self.comments_table} (rowid, text, post_id) '
+            f'VALUES (%s, %s, %s)',
+            (comment.pk, comment.text, comment.post_id)
+        )
+
+    def remove_comment(self, comment_id):
+        self._execute(
+            f'DELETE FROM {self.comments_table} WHERE rowid = %s',
+            (comment_id,)
+        )
+
+    @transaction.atomic
+    def rebuild(self):
+        self._execute(f'DELETE FROM {self.posts_table}')
+        self._execute(
+            f'INSERT INTO {self.posts_table} (rowid, text) '
+            f'SELECT id, text FROM posts_post'
+        )
+        self._execute(f'DELETE FROM {self.comments_table}')
+        self._execute(
+            f'INSERT INTO {self.comments_table} (rowid, text, post_id) '
+            f'SELECT id, text, post_id FROM posts_comment'
+        )
+        for table in (self.posts_table, self.comments_table):
+            self._execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+    def _hits_sql(self, select, match, group_id, author_id):
+        """Запрос по совпадениям в постах и комментариях с фильтрами."""
+        snippet = (
+            HIGHLIGHT_START, HIGHLIGHT_END, ELLIPSIS, SNIPPET_TOKENS
+        )
+        params = [
+            *snippet, match, self.comment_weight, *snippet, match
+        ]
+        conditions = []
+        for column, value in (('group_id', group_id),
+                              ('author_id', author_id)):
+            if value is not None:
+                conditions.append(f'post.{column} = %s')
+                params.append(value)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        sql = (
+            f'WITH hits (post_id, rank, snippet) AS ('
+            f'SELECT rowid, bm25({self.posts_table}), '
+            f'snippet({self.posts_table}, 0, %s, %s, %s, %s) '
+            f'FROM {self.posts_table} WHERE {self.posts_table} MATCH %s '
+            f'UNION ALL '
+            f'SELECT post_id, bm25({self.comments_table}) * %s, '
+            f'snippet({self.comments_table}, 0, %s, %s, %s, %s) '
+            f'FROM {self.comments_table} '
+            f'WHERE {self.comments_table} MATCH %s) '
+            f'{select} FROM hits '
+            f'JOIN posts_post post ON post.id = hits.post_id {where}'
+        )
+        return sql, params
+
+    def count(self, query, group_id=None, author_id=None):
+        match = self.match(query)
+        if not match:
+            return 0
+        sql, params = self._hits_sql(
+            'SELECT COUNT(DISTINCT hits.post_id)', match, group_id, author_id
+        )
+        (count,), = self._execute(sql, params)
+        return count
+
+    def hits(self, query, offset, limit, group_id=None, author_id=None):
+        match = self.match(query)
+        if not match:
+            return []
+        # Голая колонка snippet при MIN() в SQLite берётся из той же
+        # строки, что и минимум, то есть из лучшего совпадения.
+        sql, params = self._hits_sql(
+            'SELECT hits.post_id, hits.snippet, MIN(hits.rank) AS best',
+            match, group_id, author_id
+        )
+        sql += (
+            ' GROUP BY hits.post_id '
+            'ORDER BY best, post.pub_date DESC LIMIT %s OFFSET %s'
+        )
+        rows = self._execute(sql, [*params, limit, offset])
+        return [(post_id, snippet) for post_id, snippet, _ in rows]
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Поиск без индекса через LIKE, для баз без полнотекстового поиска.
+
+    Выдача упорядочена по дате, а не по релевантности.
+    """
+
+    def _posts(self, query, group_id, author_id):
+        tokens = tokenize(query)
+        if not tokens:
+            return Post.objects.none()
+        condition = Q()
+        for token in tokens:
+            condition &= (
+                Q(text__icontains=token) | Q(comments__text__icontains=token)
+            )
+        posts = Post.objects.filter(
+            pk__in=Post.objects.filter(condition).values('pk')
+        )
+        if group_id is not None:
+            posts = posts.filter(group_id=group_id)
+        if author_id is not None:
+            posts = posts.filter(author_id=author_id)
+        return posts
+
+    def count(self, query, group_id=None, author_id=None):
+        return self._posts(query, group_id, author_id).count()
+
+    def hits(self, query, offset, limit, group_id=None, author_id=None):
+        tokens = tokenize(query)
+        posts = self._posts(query, group_id, author_id).order_by(
+            '-pub_date', '-id'
+        ).values_list('pk', 'text')[offset:offset + limit]
+        return [(post_id, self.snippet(text, tokens))
+                for post_id, text in posts]
+
+    def snippet(self, text, tokens):
+        pattern = re.compile(
+            '|'.join(re.escape(token) for token in tokens), re.IGNORECASE
+        )
+        found = pattern.search(text)
+        start = max(found.start() - SNIPPET_CHARS // 2, 0) if found else 0
+        fragment = text[start:start + SNIPPET_CHARS]
+        fragment = pattern.sub(
+            lambda match: HIGHLIGHT_START + match.group() + HIGHLIGHT_END,
+            fragment
+        )
+        prefix = ELLIPSIS if start > 0 else ''
+        suffix = ELLIPSIS if start + SNIPPET_CHARS < len(text) else ''
+        return prefix + fragment + suffix
+
+
+def get_backend():
+    """Бэкенд из settings.SEARCH_BACKEND, один экземпляр на путь."""
+    path = settings.SEARCH_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
@@ -0,0 +1,257 @@
+"""Синтетические данные, похожие на боевые по распределениям.
+
+Активность авторов подчиняется степенному закону: автор ранга r пишет
+пропорционально 1 / r ** alpha, поэтому несколько авторов дают большую
+часть постов. На тех же весах строится граф подписок: популярных
+чаще выбирают в подписки, а первые celebrities авторов получают ещё
+и по celebrity_followers подписчиков. Число комментариев к посту
+распределено с тяжёлым хвостом вокруг comments_per_post. Часть постов
+ссылается на несколько заранее нарисованных картинок.
+
+Все случайные решения берутся из random.Random(seed) и не зависят от
+pk в базе, а даты отсчитываются назад от epoch, а не от текущего
+времени: один seed и один epoch дают одни и те же данные. Записи
+вставляются пачками bulk_create в транзакциях без сигналов,
+производные данные пересчитываются в конце (см.
+posts.transfer.rebuild_derived).
+"""
+import datetime as dt
+import random
+from io import BytesIO
+from itertools import accumulate
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from PIL import Image
+
+from . import transfer
+from .models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    'день', 'город', 'кошка', 'погода', 'книга', 'дорога', 'утро', 'море',
+    'работа', 'музыка', 'лес', 'кофе', 'поезд', 'друг', 'фильм', 'сад',
+    'вечер', 'снег', 'река', 'письмо', 'новый', 'старый', 'тихий',
+    'быстро', 'вчера', 'сегодня', 'думаю', 'видел', 'читаю', 'люблю',
+)
+IMAGE_COUNT = 8
+IMAGE_SIZE = (1920, 678)
+MAX_COMMENTS_PER_POST = 10000
+# Конец интервала дат по умолчанию.
+EPOCH = dt.datetime(2025, 1, 1, tzinfo=dt.timezone.utc)
+
+
+class Seeder:
+    """Генерирует данные; параметры — размеры и форма распределений."""
+
+    def __init__(self, users=1000, groups=20, posts=10000,
+                 comments_per_post=3, follows_per_user=20, celebrities=3,
+                 celebrity_followers=100000, images=0.1, alpha=1.2,
+                 days=365, seed=0, batch_size=5000, prefix='user',
+                 epoch=EPOCH, log=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments_per_post = comments_per_post
+        self.follows_per_user = follows_per_user
+        self.celebrities = celebrities
+        self.celebrity_followers = celebrity_followers
+        self.images = images
+        self.alpha = alpha
+        self.days = days
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.rng = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.epoch = epoch
+
+    def _insert(self, model, objects, **kwargs):
+        """Вставляет объекты пачками по batch_size, каждую в транзакции."""
+        batch, total = [], 0
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                total += self._flush(model, batch, **kwargs)
+                batch = []
+        return total + self._flush(model, batch, **kwargs)
+
+    @staticmethod
+    def _flush(model, batch, **kwargs):
+        # Даты постов и комментариев задаёт генератор, а не auto_now.
+        if batch:
+            with transaction.atomic(), transfer.keep_timestamps(model):
+                model.objects.bulk_create(batch, **kwargs)
+        return len(batch)
+
+    def _text(self, low, high):
+        return ' '.join(
+            self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        ).capitalize()
+
+    def seed_users(self):
+        existing = set(User.objects.filter(
+            username__startswith=self.prefix
+        ).values_list('username', flat=True).iterator())
+        self._insert(User, (
+            User(username=username, first_name=f'Имя {number}')
+            for number in range(self.users)
+            for username in (f'{self.prefix}{number}',)
+            if username not in existing
+        ))
+        user_ids = dict(User.objects.filter(
+            username__startswith=self.prefix
+        ).values_list('username', 'pk').iterator())
+        # Ранг активности не связан с номером пользователя: перемешиваем
+        # номера, затем первые в списке — самые активные.
+        numbers = list(range(self.users))
+        self.rng.shuffle(numbers)
+        self.user_ids = [
+            user_ids[f'{self.prefix}{number}'] for number in numbers
+        ]
+        self.cum_weights = list(accumulate(
+            1 / (rank + 1) ** self.alpha for rank in range(len(self.user_ids))
+        ))
+        self.log(f'Пользователей: {len(self.user_ids)}')
+
+    def _authors(self, count):
+        return self.rng.choices(
+            self.user_ids, cum_weights=self.cum_weights, k=count
+        )
+
+    def seed_groups(self):
+        self._insert(Group, (
+            Group(
+                title=f'Группа {number}',
+                slug=f'{self.prefix}-group-{number}',
+                description=self._text(5, 20),
+                last_activity=self.epoch
+            )
+            for number in range(self.groups)
+        ), ignore_conflicts=True)
+        group_ids = dict(Group.objects.filter(
+            slug__startswith=f'{self.prefix}-group-'
+        ).values_list('slug', 'pk'))
+        self.group_ids = [
+            group_ids[f'{self.prefix}-group-{number}']
+            for number in range(self.groups)
+        ]
+        self.log(f'Групп: {len(self.group_ids)}')
+
+    def seed_images(self):
+        """Несколько картинок-градиентов, общих для всех постов."""
+        names = []
+        for number in range(IMAGE_COUNT if self.images else 0):
+            name = f'posts/seed/seed_{number}.jpg'
+            if not default_storage.exists(name):
+                # Свой генератор: картинки могут остаться с прошлого
+                # запуска, и основной поток случайных чисел не должен
+                # от этого зависеть.
+                palette = random.Random(number)
+                color = tuple(palette.randrange(256) for _ in range(3))
+                image = Image.linear_gradient('L').resize(IMAGE_SIZE)
+                image = Image.merge('RGB', [
+                    image.point(lambda value, part=part: value * part // 255)
+                    for part in color
+                ])
+                buffer = BytesIO()
+                image.save(buffer, 'JPEG', quality=80)
+                name = default_storage.save(
+                    name, ContentFile(buffer.getvalue())
+                )
+            names.append(name)
+        self.image_names = names
+
+    def _posts(self):
+        span = dt.timedelta(days=self.days) / max(self.posts, 1)
+        start = self.epoch - dt.timedelta(days=self.days)
+        group_ids = [None, *self.group_ids]
+        for offset in range(0, self.posts, self.batch_size):
+            count = min(self.batch_size, self.posts - offset)
+            for number, author_id in enumerate(
+                self._authors(count), offset
+            ):
+                # Даты растут вместе с pk, как у настоящих публикаций.
+                pub_date = start + span * (number + self.rng.random())
+                image = ''
+                if self.image_names and self.rng.random() < self.images:
+                    image = self.rng.choice(self.image_names)
+                yield Post(
+                    author_id=author_id,
+                    group_id=self.rng.choice(group_ids),
+                    text=self._text(5, 80),
+                    pub_date=pub_date,
+                    updated=pub_date,
+                    image=image
+                )
+
+    def seed_posts(self):
+        # Комментарии пишутся только к постам этого запуска.
+        self.last_post_pk = Post.objects.aggregate(
+            last=Max('pk')
+        )['last'] or 0
+        self.log(f'Постов: {self._insert(Post, self._posts())}')
+
+    def _comment_count(self):
+        # У (X - 1) при X ~ Pareto(2) среднее 1 и тяжёлый хвост.
+        value = self.comments_per_post * (self.rng.paretovariate(2) - 1)
+        return min(int(value), MAX_COMMENTS_PER_POST)
+
+    def _comments(self):
+        posts = Post.objects.filter(pk__gt=self.last_post_pk)
+        for post_id, pub_date in posts.order_by('pk').values_list(
+            'pk', 'pub_date'
+        ).iterator(self.batch_size):
+            count = self._comment_count()
+            if not count:
+                continue
+            age = max((self.epoch - pub_date).total_seconds(), 1)
+            for author_id in self._authors(count):
+                yield Comment(
+                    post_id=post_id,
+                    author_id=author_id,
+                    text=self._text(1, 30),
+                    pub_date=pub_date + dt.timedelta(
+                        seconds=self.rng.random() * age
+                    )
+                )
+
+    def seed_comments(self):
+        self.log(f'Комментариев: {self._insert(Comment, self._comments())}')
+
+    def _follows(self):
+        users = len(self.user_ids)
+        celebrities = self.user_ids[:self.celebrities]
+        for author_id in celebrities:
+            for index in self.rng.sample(
+                range(users), min(self.celebrity_followers, users)
+            ):
+                if self.user_ids[index] != author_id:
+                    yield Follow(
+                        user_id=self.user_ids[index], author_id=author_id
+                    )
+        for user_id in self.user_ids:
+            count = min(
+                int(self.rng.expovariate(1 / self.follows_per_user))
+                if self.follows_per_user else 0,
+                users - 1
+            )
+            authors = set(self._authors(count)) - {user_id}
+            for author_id in authors:
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    def seed_follows(self):
+        # Повторы пар отбрасывает уникальное ограничение.
+        self._insert(Follow, self._follows(), ignore_conflicts=True)
+        self.log(f'Подписок: {Follow.objects.count()}')
+
+    def run(self, derived=True):
+        self.seed_users()
+        self.seed_groups()
+        self.seed_images()
+        self.seed_posts()
+        self.seed_comments()
+        self.seed_follows()
+        if derived:
+            self.log('Пересчёт производных данных')
+            transfer.rebuild_derived()
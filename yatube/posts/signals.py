@@ -0,0 +1,258 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import activity, feed_cache, groups, search, tasks, timeline
+from .counters import change_counter
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+def _profiles(user_id):
+    return Profile.objects.filter(user_id=user_id)
+
+
+def _change_group(group_id, delta):
+    if group_id is not None:
+        change_counter(
+            Group.objects.filter(pk=group_id), 'posts_count', delta
+        )
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    # Прежняя группа читается из базы перед сохранением, поэтому
+    # обработчики post_save видят её независимо от порядка регистрации.
+    # Тем же запросом читаются slug группы и имя автора для ключей кэша
+    # лент.
+    instance._initial_group_id = None
+    instance._initial_names = {}
+    if instance.pk is not None and not raw:
+        initial = Post.objects.filter(pk=instance.pk).values(
+            'group_id', 'group__slug', 'author_id', 'author__username'
+        ).first()
+        if initial is not None:
+            instance._initial_group_id = initial['group_id']
+            instance._initial_names = {
+                ('group', initial['group_id']): initial['group__slug'],
+                ('author', initial['author_id']): initial['author__username'],
+            }
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_group_id = None if created else instance._initial_group_id
+    with transaction.atomic():
+        if created:
+            change_counter(_profiles(instance.author_id), 'posts_count', 1)
+        if old_group_id != instance.group_id:
+            _change_group(old_group_id, -1)
+            _change_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    with transaction.atomic():
+        change_counter(_profiles(instance.author_id), 'posts_count', -1)
+        _change_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    with transaction.atomic():
+        change_counter(_profiles(instance.author_id), 'comments_count', 1)
+        change_counter(
+            Post.objects.filter(pk=instance.post_id), 'comments_count', 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    with transaction.atomic():
+        change_counter(_profiles(instance.author_id), 'comments_count', -1)
+        change_counter(
+            Post.objects.filter(pk=instance.post_id), 'comments_count', -1
+        )
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    with transaction.atomic():
+        change_counter(_profiles(instance.author_id), 'followers_count', 1)
+        change_counter(_profiles(instance.user_id), 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    with transaction.atomic():
+        change_counter(_profiles(instance.author_id), 'followers_count', -1)
+        change_counter(_profiles(instance.user_id), 'following_count', -1)
+        # Читаем в той же транзакции: строка заблокирована обновлением,
+        # и каждое значение счётчика видит ровно одна отписка.
+        followers_count = _profiles(instance.author_id).values_list(
+            'followers_count', flat=True
+        ).first()
+    if followers_count == settings.TIMELINE_FANOUT_LIMIT:
+        # Автор опустился до порога: посты, опубликованные выше него,
+        # в ленты подписчиков не раскладывались.
+        tasks.backfill_followers.delay(instance.author_id)
+
+
+def _timeline_inline(author_id, field):
+    """Мало ли строк ленты затронет изменение: по счётчику автора field."""
+    count = _profiles(author_id).values_list(field, flat=True).first()
+    return (count or 0) <= settings.TIMELINE_INLINE_LIMIT
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    if _timeline_inline(instance.author_id, 'followers_count'):
+        timeline.fan_out_post(instance)
+    else:
+        tasks.fan_out_post.delay(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    if _timeline_inline(instance.author_id, 'posts_count'):
+        timeline.backfill(instance.user_id, instance.author_id)
+    else:
+        tasks.backfill_timeline.delay(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    if _timeline_inline(instance.author_id, 'posts_count'):
+        timeline.remove(instance.user_id, instance.author_id)
+    else:
+        tasks.clear_timeline.delay(instance.user_id, instance.author_id)
+
+
+def _related_name(post, field, attr, known):
+    """attr связанного объекта field: из загруженного объекта или known.
+
+    Запрос к базе — только если ни то, ни другое его не знает.
+    """
+    related = Post._meta.get_field(field)
+    pk = getattr(post, related.attname)
+    if pk is None:
+        return None
+    if related.is_cached(post):
+        cached = related.get_cached_value(post)
+        if cached is not None and cached.pk == pk:
+            return getattr(cached, attr)
+    if (field, pk) in known:
+        return known[field, pk]
+    return related.related_model.objects.filter(pk=pk).values_list(
+        attr, flat=True
+    ).first()
+
+
+def _bump_post_feeds(post, old_group_id=None, known=None):
+    known = known or {}
+    feed_cache.bump_version('index')
+    feed_cache.bump_version('post', post.pk)
+    feed_cache.bump_version(
+        'profile', _related_name(post, 'author', 'username', known)
+    )
+    slugs = {_related_name(post, 'group', 'slug', known)}
+    if old_group_id is not None:
+        slugs.add(known.get(('group', old_group_id)))
+    slugs.discard(None)
+    if not slugs:
+        return
+    for slug in slugs:
+        feed_cache.bump_version('group', slug)
+    # Счётчики постов и активность групп — в реестре групп.
+    feed_cache.bump_version(*groups.SCOPE)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_feeds(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _bump_post_feeds(
+            instance, instance._initial_group_id, instance._initial_names
+        )
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_feeds(sender, instance, **kwargs):
+    _bump_post_feeds(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_comments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feed_cache.bump_version('post', instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_all_feeds(sender, **kwargs):
+    feed_cache.bump_version(*feed_cache.GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.get_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_saved_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_comment(sender, instance, **kwargs):
+    search.get_backend().remove_comment(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def touch_saved_post_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        activity.touch_profile(instance.author_id)
+        activity.touch_groups(instance.group_id, instance._initial_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def touch_deleted_post_pages(sender, instance, **kwargs):
+    activity.touch_profile(instance.author_id)
+    activity.touch_groups(instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        activity.touch_post(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_followed_profile(sender, instance, raw=False, **kwargs):
+    if not raw:
+        activity.touch_profile(instance.author_id)
@@ -0,0 +1,44 @@
+"""Фоновые задачи постов (см. core.jobs)."""
+from core.jobs import PRIORITY_HIGH, task
+
+from . import images, timeline
+from .models import Follow, Post
+
+
+@task(key=lambda post_id: f'post-images:{post_id}')
+def build_image_derivatives(post_id):
+    try:
+        images.generate(post_id)
+    except Post.DoesNotExist:
+        pass
+
+
+@task()
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'pub_date'
+    ).first()
+    if post is not None:
+        timeline.fan_out_post(post)
+
+
+@task(key=lambda author_id: f'timeline-followers:{author_id}')
+def backfill_followers(author_id):
+    timeline.backfill_followers(author_id)
+
+
+# Подписка и отписка видны самому пользователю, поэтому их задачи
+# идут раньше. Задачи сверяются с текущим состоянием подписки: после
+# быстрой отписки и повторной подписки порядок выполнения не важен.
+@task(priority=PRIORITY_HIGH)
+def backfill_timeline(user_id, author_id):
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        timeline.backfill(user_id, author_id)
+
+
+@task(priority=PRIORITY_HIGH)
+def clear_timeline(user_id, author_id):
+    if not Follow.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).exists():
+        timeline.remove(user_id, author_id)
@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.page_cache import marker
+
+register = template.Library()
+
+
+@register.simple_tag
+def late(name, **kwargs):
+    """Метка персонального фрагмента name из settings.LATE_FRAGMENTS.
+
+    Фрагмент отрисует LateFragmentMiddleware для текущего пользователя
+    уже после того, как страница (возможно, из кэша) готова. Параметры
+    должны сериализоваться в JSON.
+    """
+    return mark_safe(marker(name, kwargs))
@@ -0,0 +1,34 @@
+from itertools import islice
+
+from django import template
+from django.conf import settings
+
+from posts import groups
+from posts.forms import CommentForm
+from posts.models import Follow
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, username):
+    user = context['request'].user
+    if not user.is_authenticated:
+        return False
+    return Follow.objects.filter(
+        user=user, author__username=username
+    ).exists()
+
+
+@register.simple_tag
+def comment_form():
+    return CommentForm()
+
+
+@register.simple_tag
+def active_groups(slug):
+    """Самые активные группы, кроме группы slug, для боковой панели."""
+    others = (
+        group for group in groups.registry().values() if group.slug != slug
+    )
+    return list(islice(others, settings.GROUP_SIDEBAR_SIZE))
@@ -0,0 +1,55 @@
+from django import template
+from django.conf import settings
+
+from posts.images import FALLBACK_FORMAT
+
+register = template.Library()
+
+
+def _srcset(derivatives):
+    return ', '.join(
+        f'{derivative.file.url} {derivative.width}w'
+        for derivative in derivatives
+    )
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post):
+    """Картинка поста с srcset по производным, а пока их нет — оригинал.
+
+    Производные читаются из post.derivatives.all(), поэтому ленты
+    подгружают их через prefetch_related('derivatives').
+    """
+    if not post.image:
+        return {}
+    by_format = {}
+    for derivative in post.derivatives.all():
+        if derivative.source == post.image.name:
+            by_format.setdefault(derivative.format, []).append(derivative)
+    fallback = by_format.pop(FALLBACK_FORMAT, None)
+    if not fallback:
+        return {'src': post.image.url}
+    fallback.sort(key=lambda derivative: derivative.width)
+    default_width = settings.POST_IMAGE_CROP[0]
+    default = min(
+        fallback,
+        key=lambda derivative: abs(derivative.width - default_width)
+    )
+    return {
+        'sources': [
+            {
+                'type': derivatives[0].mime_type,
+                'srcset': _srcset(sorted(
+                    derivatives, key=lambda derivative: derivative.width
+                )),
+            }
+            for image_format in settings.POST_IMAGE_FORMATS
+            for derivatives in [by_format.get(image_format)]
+            if derivatives
+        ],
+        'src': default.file.url,
+        'srcset': _srcset(fallback),
+        'sizes': settings.POST_IMAGE_SIZES,
+        'width': default.width,
+        'height': default.height,
+    }
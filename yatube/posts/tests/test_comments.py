@@ -0,0 +1,58 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+CURSOR = re.compile(r'\?cursor=([\w-]+)')
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTest(TestCase):
+    """Комментарии поста выводятся порциями по курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for number in range(5):
+            commentator = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(
+                post=cls.post, author=commentator, text=f'Комментарий {number}'
+            )
+        cls.url_post = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.url_comments = reverse('posts:post_comments', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_in_post_detail(self):
+        response = self.client.get(self.url_post)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2']
+        )
+        self.assertContains(response, 'Комментариев: 5')
+        self.assertNotContains(response, 'Комментарий 3')
+        self.assertContains(response, self.url_comments)
+
+    def test_next_pages_from_fragment(self):
+        cursor = CURSOR.search(
+            self.client.get(self.url_post).content.decode()
+        ).group(1)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url_comments, {'cursor': cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'reader3')
+        self.assertContains(response, 'Комментарий 4')
+        self.assertNotContains(response, 'Комментарий 2')
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 1])
+        )
+        self.assertEqual(response.status_code, 404)
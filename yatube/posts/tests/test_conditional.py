@@ -0,0 +1,123 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+# Валидаторы самих видов: оболочки из кэша страниц их не выставляют.
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ConditionalGetTest(TestCase):
+    """Страницы поста, профиля и группы отвечают 304 по валидаторам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.url_post = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.url_profile = reverse('posts:profile', args=['author'])
+        cls.url_group = reverse('posts:group_posts', args=['test-slug'])
+        cls.urls = (cls.url_post, cls.url_profile, cls.url_group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def assertNotModified(self, client, url, **headers):
+        response = client.get(url, **headers)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        return response
+
+    def assertModified(self, client, url, etag):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_anonymous_validators(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response.has_header('Last-Modified'))
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                not_modified = self.assertNotModified(
+                    self.guest, url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                # Время изменения группы берётся из реестра групп.
+                self.assertEqual(
+                    not_modified.query_stats.count,
+                    0 if url == self.url_group else 1
+                )
+                self.assertIn('public', not_modified['Cache-Control'])
+                self.assertNotModified(
+                    self.guest, url,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+
+    def test_authenticated_validators(self):
+        """Авторизованным — только ETag, свой для каждого пользователя."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertIn('private', response['Cache-Control'])
+                self.assertNotEqual(
+                    response['ETag'], self.guest.get(url)['ETag']
+                )
+                self.assertNotModified(
+                    self.reader_client, url,
+                    HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                response = self.reader_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date()
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_comment_changes_post(self):
+        etag = self.guest.get(self.url_post)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.assertModified(self.guest, self.url_post, etag)
+
+    def test_follow_changes_profile(self):
+        etag = self.reader_client.get(self.url_profile)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertModified(self.reader_client, self.url_profile, etag)
+
+    def test_new_post_changes_pages(self):
+        etags = {url: self.guest.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(
+            author=self.author, group=self.group, text='Новый пост'
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertModified(self.guest, url, etag)
+
+    def test_group_edit_changes_group(self):
+        etag = self.guest.get(self.url_group)['ETag']
+        self.group.description = 'Новое описание'
+        self.group.save()
+        self.assertModified(self.guest, self.url_group, etag)
+
+    def test_missing_object(self):
+        response = self.guest.get(
+            reverse('posts:profile', args=['nobody']),
+            HTTP_IF_NONE_MATCH='*'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,114 @@
+import datetime as dt
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import digest
+from posts.models import Follow, Post, Profile, User
+
+
+class DigestTest(TestCase):
+    """Письма с новыми постами подписок собираются пачками."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.first = User.objects.create_user(username='first')
+        cls.second = User.objects.create_user(username='second')
+        cls.readers = {
+            name: User.objects.create_user(
+                username=name, email=f'{name}@example.com' if email else ''
+            )
+            for name, email in (
+                ('daily', True), ('hourly', True), ('off', True),
+                ('noemail', False), ('other', True),
+            )
+        }
+        # Письма только по подписке: 'off' оставлен по умолчанию.
+        for name, period in (('daily', Profile.DIGEST_DAILY),
+                             ('hourly', Profile.DIGEST_HOURLY),
+                             ('noemail', Profile.DIGEST_DAILY),
+                             ('other', Profile.DIGEST_DAILY)):
+            Profile.objects.filter(user=cls.readers[name]).update(
+                digest=period
+            )
+        for reader in cls.readers.values():
+            for author in (cls.first, cls.second):
+                Follow.objects.create(user=reader, author=author)
+        for author, text, age in (
+            (cls.first, 'Позавчерашний пост', dt.timedelta(days=2)),
+            (cls.first, 'Утренний пост', dt.timedelta(hours=5)),
+            (cls.second, 'Свежий пост', dt.timedelta(minutes=30)),
+        ):
+            post = Post.objects.create(author=author, text=text)
+            Post.objects.filter(pk=post.pk).update(pub_date=cls.now - age)
+
+    def send(self, period, **kwargs):
+        return digest.send(period, now=self.now, **kwargs)
+
+    def test_daily_digest(self):
+        self.assertEqual(self.send(Profile.DIGEST_DAILY), 2)
+        recipients = sorted(message.to[0] for message in mail.outbox)
+        self.assertEqual(
+            recipients, ['daily@example.com', 'other@example.com']
+        )
+        body = mail.outbox[0].body
+        self.assertIn('Свежий пост', body)
+        self.assertIn('Утренний пост', body)
+        self.assertNotIn('Позавчерашний пост', body)
+        self.assertLess(body.index('Свежий пост'), body.index('Утренний'))
+        self.assertIn('text/html', mail.outbox[0].alternatives[0])
+
+    def test_hourly_digest_covers_last_hour(self):
+        self.assertEqual(self.send(Profile.DIGEST_HOURLY), 1)
+        self.assertIn('Свежий пост', mail.outbox[0].body)
+        self.assertNotIn('Утренний пост', mail.outbox[0].body)
+
+    def test_posts_are_not_sent_twice(self):
+        self.send(Profile.DIGEST_DAILY)
+        self.assertEqual(self.send(Profile.DIGEST_DAILY), 0)
+        self.assertEqual(
+            Profile.objects.get(user=self.readers['daily']).digest_sent_at,
+            self.now
+        )
+
+    def test_one_query_for_posts_per_batch(self):
+        # Читатели, посты и отметка об отправке на пачку.
+        with self.assertNumQueries(3):
+            self.send(Profile.DIGEST_DAILY)
+        Profile.objects.update(digest_sent_at=None)
+        with self.assertNumQueries(5):
+            self.send(Profile.DIGEST_DAILY, batch_size=1)
+
+    @override_settings(DIGEST_POSTS=1)
+    def test_long_digest_links_to_timeline(self):
+        self.send(Profile.DIGEST_DAILY)
+        body = mail.outbox[0].body
+        self.assertNotIn('Утренний пост', body)
+        self.assertIn('И ещё 1 в ленте подписок', body)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('send_digests', 'hourly', stdout=out)
+        self.assertIn('Писем в очереди: 1', out.getvalue())
+
+    def test_digest_is_off_by_default(self):
+        self.assertEqual(
+            User.objects.create_user(username='new').profile.digest,
+            Profile.DIGEST_OFF
+        )
+
+    def test_settings_page(self):
+        self.client.force_login(self.readers['daily'])
+        response = self.client.post(
+            reverse('users:digest'), {'digest': Profile.DIGEST_OFF}
+        )
+        self.assertRedirects(response, reverse('users:digest'))
+        self.assertEqual(
+            Profile.objects.get(user=self.readers['daily']).digest,
+            Profile.DIGEST_OFF
+        )
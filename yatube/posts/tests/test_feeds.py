@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class FeedTest(TestCase):
+    """RSS и Atom кэшируются по версии ленты и отвечают 304."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост в группе'
+        )
+        Post.objects.create(author=cls.other, text='Пост без группы')
+        cls.urls = {
+            'index': reverse('posts:index_atom'),
+            'group': reverse('posts:group_rss', args=['test-slug']),
+            'profile': reverse('posts:profile_atom', args=['author']),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_list_posts_of_scope(self):
+        index = self.client.get(self.urls['index'])
+        self.assertEqual(
+            index['Content-Type'], 'application/atom+xml; charset=utf-8'
+        )
+        self.assertContains(index, 'Пост в группе')
+        self.assertContains(index, 'Пост без группы')
+        group = self.client.get(self.urls['group'])
+        self.assertTrue(
+            group['Content-Type'].startswith('application/rss+xml')
+        )
+        self.assertContains(group, 'Пост в группе')
+        self.assertNotContains(group, 'Пост без группы')
+        profile = self.client.get(self.urls['profile'])
+        self.assertContains(profile, 'Пост в группе')
+        self.assertNotContains(profile, 'Пост без группы')
+
+    def test_idle_poll_without_queries(self):
+        for url in self.urls.values():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertNumQueries(0):
+                    by_etag = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                    by_date = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                    )
+                    again = self.client.get(url)
+                self.assertEqual(by_etag.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(by_date.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(again.content, response.content)
+
+    def test_new_post_regenerates_only_its_feeds(self):
+        etags = {
+            scope: self.client.get(url)['ETag']
+            for scope, url in self.urls.items()
+        }
+        Post.objects.create(author=self.other, text='Свежий пост')
+        self.assertNotEqual(
+            self.client.get(self.urls['index'])['ETag'], etags['index']
+        )
+        for scope in ('group', 'profile'):
+            with self.subTest(scope=scope):
+                response = self.client.get(
+                    self.urls[scope], HTTP_IF_NONE_MATCH=etags[scope]
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_missing_group(self):
+        response = self.client.get(reverse('posts:group_rss', args=['nope']))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
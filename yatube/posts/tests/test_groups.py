@@ -0,0 +1,81 @@
+import datetime as dt
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import groups
+from posts.forms import PostForm
+from posts.models import Group, Post, User
+
+URL_GROUP_LIST = reverse('posts:group_list')
+
+
+class GroupRegistryTest(TestCase):
+    """Реестр групп в кэше, каталог и панель групп."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.quiet = Group.objects.create(
+            title='Тихая группа', slug='quiet', description='Описание'
+        )
+        cls.busy = Group.objects.create(
+            title='Активная группа', slug='busy', description='Описание'
+        )
+        Group.objects.filter(pk=cls.quiet.pk).update(
+            last_activity=timezone.now() - dt.timedelta(days=1)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_registry_is_cached(self):
+        with self.assertNumQueries(1):
+            groups.registry()
+        with self.assertNumQueries(0):
+            self.assertEqual(list(groups.registry()), ['busy', 'quiet'])
+            self.assertEqual(groups.get_group_or_404('busy'), self.busy)
+
+    def test_registry_follows_changes(self):
+        groups.registry()
+        Post.objects.create(
+            author=self.author, group=self.quiet, text='Тестовый пост'
+        )
+        registry = groups.registry()
+        self.assertEqual(list(registry), ['quiet', 'busy'])
+        self.assertEqual(registry['quiet'].posts_count, 1)
+        Group.objects.create(title='Новая', slug='new', description='')
+        self.assertIn('new', groups.registry())
+
+    def test_directory_sorted_by_activity(self):
+        response = self.client.get(URL_GROUP_LIST)
+        self.assertEqual(
+            [group.slug for group in response.context['groups']],
+            ['busy', 'quiet']
+        )
+        self.assertContains(
+            response, reverse('posts:group_posts', args=['quiet'])
+        )
+
+    def test_missing_group(self):
+        response = self.client.get(
+            reverse('posts:group_posts', args=['missing'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_form_choices_without_queries(self):
+        groups.registry()
+        with self.assertNumQueries(0):
+            html = str(PostForm()['group'])
+        self.assertIn('Тихая группа', html)
+        self.assertIn(f'value="{self.busy.pk}"', html)
+
+    def test_sidebar_lists_other_groups(self):
+        response = self.client.get(
+            reverse('posts:group_posts', args=['busy'])
+        )
+        self.assertContains(response, 'Активные сообщества')
+        self.assertContains(response, 'Тихая группа')
+        self.assertContains(response, URL_GROUP_LIST)
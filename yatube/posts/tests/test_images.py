@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.jobs import Worker
+from core.models import Job
+from posts import images, tasks
+from posts.models import Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+URL_INDEX = reverse('posts:index')
+URL_CREATE_POST = reverse('posts:post_create')
+
+
+def make_image(name='picture.png', size=(1000, 500)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/png'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=True)
+class ImageDerivativeTest(TestCase):
+    """Производные картинок строятся вне рендера, шаблоны их не ждут."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.post = Post.objects.create(
+            author=self.author, text='Тестовый пост', image=make_image()
+        )
+        self.url_detail = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_original_until_derivatives_ready(self):
+        """До готовности производных показывается оригинал без srcset."""
+        response = self.client.get(self.url_detail)
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        self.assertNotContains(response, 'srcset')
+
+    def test_generate_derivatives(self):
+        """Ширины не больше исходной, все доступные форматы, размеры."""
+        self.assertTrue(images.generate(self.post.pk))
+        derivatives = self.post.derivatives.all()
+        formats = images.available_formats()
+        self.assertIn('JPEG', formats)
+        self.assertEqual(
+            sorted({(d.format, d.width) for d in derivatives}),
+            sorted(
+                (image_format, width)
+                for image_format in formats for width in (320, 640, 960)
+            )
+        )
+        for derivative in derivatives:
+            with derivative.file.open() as file:
+                image = Image.open(file)
+                self.assertEqual(image.format, derivative.format)
+                self.assertEqual(
+                    image.size, (derivative.width, derivative.height)
+                )
+        self.assertFalse(images.generate(self.post.pk))
+
+    def test_srcset(self):
+        """Шаблон отдаёт srcset, sizes и размеры без запросов к файлам."""
+        images.generate(self.post.pk)
+        jpeg = self.post.derivatives.filter(format='JPEG')
+        response = self.client.get(URL_INDEX)
+        srcset = ', '.join(
+            f'{derivative.file.url} {derivative.width}w'
+            for derivative in jpeg.order_by('width')
+        )
+        self.assertContains(response, f'srcset="{srcset}"')
+        self.assertContains(response, f'sizes="{settings.POST_IMAGE_SIZES}"')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertNotContains(response, f'src="{self.post.image.url}"')
+
+    def test_modern_format_sources(self):
+        """Новые форматы идут в <source> перед JPEG."""
+        with mock.patch.object(
+            images, 'available_formats', return_value=['WEBP', 'JPEG']
+        ), mock.patch.object(Image.Image, 'save'):
+            images.generate(self.post.pk)
+        response = self.client.get(self.url_detail)
+        self.assertContains(response, '<source type="image/webp"')
+
+    def test_replaced_image(self):
+        """Новая картинка заменяет производные старой."""
+        images.generate(self.post.pk)
+        old = list(self.post.derivatives.all())
+        self.post.image = make_image('new.png', (400, 400))
+        self.post.save()
+        response = self.client.get(self.url_detail)
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        images.generate(self.post.pk)
+        self.assertEqual(
+            set(self.post.derivatives.values_list('source', flat=True)),
+            {self.post.image.name}
+        )
+        self.assertEqual(
+            set(self.post.derivatives.values_list('width', flat=True)),
+            {320}
+        )
+        for derivative in old:
+            self.assertFalse(
+                derivative.file.storage.exists(derivative.file.name)
+            )
+
+    def test_create_schedules_derivatives(self):
+        """Новый пост с картинкой получает производные задачей очереди."""
+        self.client.post(URL_CREATE_POST, data={
+            'text': 'Пост с картинкой',
+            'group': self.group.pk,
+            'image': make_image('new.png'),
+        })
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertTrue(post.derivatives.exists())
+
+    @override_settings(JOBS_EAGER=False)
+    def test_repeated_schedules_collapse(self):
+        for _ in range(2):
+            tasks.build_image_derivatives.delay(self.post.pk)
+        self.assertEqual(Job.objects.count(), 1)
+        Worker().run_once()
+        self.assertTrue(self.post.derivatives.exists())
+        self.assertFalse(Job.objects.exists())
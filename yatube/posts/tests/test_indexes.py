@@ -0,0 +1,115 @@
+import re
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.paginator import KeysetPaginator
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)$')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN для SQLite')
+class FeedQueryPlanTest(TestCase):
+    """Запросы лент читают таблицы по индексам, без полного прохода."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndexes(self, queryset, searched=()):
+        """Нет полного прохода и сортировки во временном B-дереве.
+
+        Таблицы из searched должны читаться поиском по индексу (SEARCH),
+        а не проходом всего индекса по порядку.
+        """
+        plan = self.query_plan(queryset)
+        problems = [
+            step for step in plan
+            if FULL_SCAN.match(step) or 'TEMP B-TREE' in step
+            or any(step.startswith(f'SCAN {table} ') for table in searched)
+        ]
+        self.assertEqual(problems, [], f'План запроса: {plan}')
+
+    def assertFeedUsesIndexes(self, queryset, table,
+                              keys=('-pub_date', '-id')):
+        """Первая и следующая страницы курсорной пагинации ленты."""
+        paginator = KeysetPaginator(queryset, 10, keys=keys)
+        seek = paginator._seek(keys, [self.post.pub_date, self.post.pk])
+        filtered = queryset.query.where
+        self.assertUsesIndexes(
+            queryset.order_by(*keys)[:11],
+            searched=[table] if filtered else []
+        )
+        next_page = queryset.filter(seek).order_by(*keys)[:11]
+        self.assertUsesIndexes(next_page, searched=[table])
+        plan = self.query_plan(next_page)
+        self.assertTrue(
+            any(
+                step.startswith(f'SEARCH {table} ') and 'pub_date<' in step
+                for step in plan
+            ),
+            f'Курсор не ограничивает диапазон индекса: {plan}'
+        )
+
+    def test_index_feed(self):
+        self.assertFeedUsesIndexes(
+            Post.objects.select_related('author', 'group'), 'posts_post'
+        )
+
+    def test_group_feed(self):
+        self.assertFeedUsesIndexes(self.group.posts.all(), 'posts_post')
+
+    def test_profile_feed(self):
+        self.assertFeedUsesIndexes(
+            self.author.posts.select_related('group'), 'posts_post'
+        )
+
+    def test_follow_feed(self):
+        queryset = TimelineEntry.objects.filter(
+            user=self.reader
+        ).select_related('post__author', 'post__group')
+        self.assertFeedUsesIndexes(
+            queryset, 'posts_timelineentry', keys=('-pub_date', '-post_id')
+        )
+
+    def test_post_comments(self):
+        self.assertUsesIndexes(
+            Comment.objects.filter(post=self.post).select_related('author'),
+            searched=['posts_comment']
+        )
+
+    def test_follow_lookups(self):
+        self.assertUsesIndexes(
+            Follow.objects.filter(user=self.reader, author=self.author),
+            searched=['posts_follow']
+        )
+        self.assertUsesIndexes(
+            Follow.objects.filter(author=self.author).values('user_id'),
+            searched=['posts_follow']
+        )
+
+    def test_harness_detects_unindexed_filter(self):
+        with self.assertRaises(AssertionError):
+            self.assertUsesIndexes(
+                Post.objects.filter(text='Тестовый пост'),
+                searched=['posts_post']
+            )
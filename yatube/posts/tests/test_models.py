@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, Profile
 
 User = get_user_model()
 
@@ -58,3 +61,96 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value
                 )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Вторая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            with self.subTest(obj=obj, field=field):
+                self.assertEqual(getattr(obj, field), value)
+
+    def test_post_counters(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        self.assertCounters(self.author.profile, posts_count=1)
+        self.assertCounters(self.group, posts_count=1)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(self.group, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=1)
+        post.delete()
+        self.assertCounters(self.author.profile, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=0)
+
+    def test_group_counters_follow_stored_group(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        stale = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        stale.group = None
+        stale.save()
+        self.assertCounters(self.group, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=0)
+
+    def test_comment_counters(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        self.assertCounters(post, comments_count=1)
+        self.assertCounters(self.reader.profile, comments_count=1)
+        comment.delete()
+        self.assertCounters(post, comments_count=0)
+        self.assertCounters(self.reader.profile, comments_count=0)
+
+    def test_follow_counters(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(self.author.profile, followers_count=1)
+        self.assertCounters(self.reader.profile, following_count=1)
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertCounters(self.author.profile, followers_count=0)
+        self.assertCounters(self.reader.profile, following_count=0)
+
+    def test_recount_repairs_drift(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Profile.objects.update(
+            posts_count=7,
+            comments_count=7,
+            followers_count=7,
+            following_count=7
+        )
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=7)
+        call_command('recount', stdout=StringIO())
+        self.assertCounters(
+            self.author.profile, posts_count=1, followers_count=1
+        )
+        self.assertCounters(
+            self.reader.profile, comments_count=1, following_count=1
+        )
+        self.assertCounters(self.group, posts_count=1)
+        self.assertCounters(post, comments_count=1)
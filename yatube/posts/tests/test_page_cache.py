@@ -0,0 +1,108 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=60)
+class PageCacheTest(TestCase):
+    """Кэш страниц для гостей и оболочки с фрагментами для остальных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.url_post = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.url_profile = reverse('posts:profile', args=['author'])
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=['test-slug']),
+            cls.url_profile,
+            cls.url_post,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_anonymous_hit_without_queries(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest.get(url)
+                second = self.guest.get(url)
+                self.assertEqual(second.status_code, HTTPStatus.OK)
+                self.assertEqual(second['X-Page-Cache'], 'hit')
+                self.assertEqual(second.query_stats.count, 0)
+                self.assertEqual(second.content, first.content)
+                self.assertNotIn(b'<!--late:', second.content)
+                self.assertContains(second, 'Войти')
+
+    def test_anonymous_not_modified_from_cache(self):
+        etag = self.guest.get(self.url_post)['ETag']
+        response = self.guest.get(self.url_post, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.query_stats.count, 0)
+
+    def test_signals_purge_pages(self):
+        for url in self.urls:
+            self.guest.get(url)
+        Post.objects.create(
+            author=self.author, group=self.group, text='Свежий пост'
+        )
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Свежий комментарий'
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertFalse(response.has_header('X-Page-Cache'))
+                self.assertContains(
+                    response,
+                    'Свежий комментарий' if url == self.url_post
+                    else 'Свежий пост'
+                )
+
+    def test_fragments_are_personal(self):
+        """Оболочка общая, а шапка и формы — свои у каждого."""
+        self.guest.get(self.url_post)
+        reader = self.reader_client.get(self.url_post)
+        self.assertEqual(reader['X-Page-Cache'], 'hit')
+        self.assertIn('private', reader['Cache-Control'])
+        self.assertContains(reader, 'Пользователь: reader')
+        self.assertContains(reader, 'Добавить комментарий')
+        self.assertContains(reader, 'csrfmiddlewaretoken')
+        self.assertNotContains(reader, 'редактировать запись')
+        author = self.author_client.get(self.url_post)
+        self.assertContains(author, 'Пользователь: author')
+        self.assertContains(author, 'редактировать запись')
+        guest = self.guest.get(self.url_post)
+        self.assertNotContains(guest, 'Добавить комментарий')
+
+    def test_follow_button(self):
+        self.assertContains(
+            self.reader_client.get(self.url_profile), 'Подписаться'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(self.url_profile)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Отписаться')
+
+    def test_other_views_are_not_cached(self):
+        url = reverse('posts:search')
+        self.guest.get(url)
+        self.assertFalse(self.guest.get(url).has_header('X-Page-Cache'))
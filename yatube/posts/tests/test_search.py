@@ -0,0 +1,149 @@
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Group, Post, User
+
+URL_SEARCH = reverse('posts:search')
+SIMPLE_BACKEND = 'posts.search.SimpleSearchBackend'
+
+
+class SearchTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.in_text = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Кошки любят тёплые подоконники'
+        )
+        cls.in_comment = Post.objects.create(
+            author=cls.other,
+            text='Про погоду'
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.in_comment,
+            author=cls.author,
+            text='А мои кошки спят весь день'
+        )
+        Post.objects.create(author=cls.other, text='Совсем о другом')
+
+    def found(self, query, **filters):
+        results = search.get_backend().search(query, **filters)
+        return list(results[:results.count()])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 есть в SQLite')
+class FTS5SearchTest(SearchTestMixin, TestCase):
+    """Поиск по индексу FTS5: ранжирование, фрагменты, фильтры."""
+
+    def test_rank_and_snippet(self):
+        """Совпадение в тексте выше совпадения в комментарии."""
+        posts = self.found('кошк')
+        self.assertEqual(posts, [self.in_text, self.in_comment])
+        self.assertIn('<mark>Кошки</mark>', posts[0].snippet)
+        self.assertIn('<mark>кошки</mark>', posts[1].snippet)
+
+    def test_filters(self):
+        self.assertEqual(
+            self.found('кошки', group_id=self.group.pk), [self.in_text]
+        )
+        self.assertEqual(
+            self.found('кошки', author_id=self.other.pk), [self.in_comment]
+        )
+
+    def test_query_syntax_is_escaped(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.found('"кошки* OR (NEAR'), [])
+        self.assertEqual(self.found('   '), [])
+
+    def test_snippet_is_escaped(self):
+        post = Post.objects.create(
+            author=self.author, text='<script>alert()</script>'
+        )
+        found, = self.found('alert')
+        self.assertEqual(found, post)
+        self.assertEqual(
+            found.snippet, '&lt;script&gt;<mark>alert</mark>()&lt;/script&gt;'
+        )
+
+    def test_incremental_updates(self):
+        """Индекс следит за изменением и удалением постов и комментариев."""
+        post = Post.objects.get(pk=self.in_text.pk)
+        post.text = 'Собаки любят прогулки'
+        post.save()
+        self.assertEqual(self.found('собаки'), [post])
+        self.assertEqual(self.found('кошки'), [self.in_comment])
+        Comment.objects.get(pk=self.comment.pk).delete()
+        self.assertEqual(self.found('кошки'), [])
+        post.delete()
+        self.assertEqual(self.found('собаки'), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_search_post')
+            cursor.execute('DELETE FROM posts_search_comment')
+        self.assertEqual(self.found('кошки'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('кошки'), [self.in_text, self.in_comment])
+
+
+@override_settings(SEARCH_BACKEND=SIMPLE_BACKEND)
+class SimpleSearchTest(SearchTestMixin, TestCase):
+    """Запасной бэкенд без индекса ищет по постам и комментариям."""
+
+    def test_search(self):
+        posts = self.found('подоконник')
+        self.assertEqual(posts, [self.in_text])
+        self.assertIn('<mark>подоконник</mark>', posts[0].snippet)
+        self.assertEqual(
+            set(self.found('спят')), {self.in_comment}
+        )
+        self.assertEqual(
+            self.found('подоконник', author_id=self.other.pk), []
+        )
+
+
+class SearchViewTest(SearchTestMixin, TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_search_page(self):
+        response = self.client.get(URL_SEARCH, {'q': 'подоконник'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context['page_obj']), [self.in_text]
+        )
+        self.assertContains(response, '<mark>')
+        self.assertLessEqual(response.query_stats.count, 6)
+
+    def test_filters_by_slug_and_username(self):
+        response = self.client.get(URL_SEARCH, {
+            'q': 'кошки', 'group': self.group.slug, 'author': 'author'
+        })
+        self.assertEqual(
+            list(response.context['page_obj']), [self.in_text]
+        )
+
+    def test_unknown_author(self):
+        response = self.client.get(
+            URL_SEARCH, {'q': 'кошки', 'author': 'nobody'}
+        )
+        self.assertIsNone(response.context['page_obj'])
+        self.assertContains(response, 'Такого автора нет')
+
+    def test_empty_form(self):
+        response = self.client.get(URL_SEARCH)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['page_obj'])
@@ -0,0 +1,99 @@
+import datetime as dt
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Follow, Group, Post, Profile, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedTest(TestCase):
+    """Команда seed: воспроизводимые данные со степенным законом."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, **options):
+        options = {
+            'users': 50, 'groups': 3, 'posts': 300,
+            'comments_per_post': 2, 'follows_per_user': 3,
+            'celebrities': 1, 'celebrity_followers': 40,
+            'images': 0.05, 'seed': 7, 'batch_size': 64,
+            **options,
+        }
+        call_command('seed', stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', 'group__slug', 'text', 'image',
+                'pub_date'
+            )),
+            list(Follow.objects.order_by(
+                'user__username', 'author__username'
+            ).values_list('user__username', 'author__username')),
+            list(Comment.objects.order_by('pk').values_list(
+                'post__text', 'author__username', 'text', 'pub_date'
+            )),
+        )
+
+    def test_dataset_shape(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        counts = sorted(
+            Profile.objects.values_list('posts_count', flat=True),
+            reverse=True
+        )
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+        celebrity = Profile.objects.order_by('-followers_count').first()
+        self.assertGreaterEqual(celebrity.followers_count, 39)
+        self.assertTrue(Comment.objects.exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True
+        ))
+        self.assertEqual(dates, sorted(dates))
+
+    def test_same_seed_same_data(self):
+        self.seed()
+        first = self.snapshot()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_same_seed_same_data_with_other_pks(self):
+        self.seed()
+        first = self.snapshot()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        # Те же пользователи, но с другим порядком pk.
+        User.objects.bulk_create(
+            User(username=f'user{number}', first_name=f'Имя {number}')
+            for number in reversed(range(50))
+        )
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_epoch_sets_dates(self):
+        self.seed(epoch='2020-06-01T00:00:00+00:00', days=10)
+        self.assertLessEqual(
+            Post.objects.latest('pub_date').pub_date,
+            dt.datetime(2020, 6, 1, tzinfo=dt.timezone.utc)
+        )
+        self.assertGreaterEqual(
+            Post.objects.earliest('pub_date').pub_date,
+            dt.datetime(2020, 5, 22, tzinfo=dt.timezone.utc)
+        )
@@ -0,0 +1,166 @@
+import datetime as dt
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import search
+from posts.management.commands.import_posts import (read_checkpoint,
+                                                    write_checkpoint)
+from posts.models import (Comment, Follow, Group, ImportedPost, Post,
+                          Profile, TimelineEntry, User)
+
+
+class TransferTest(TestCase):
+    """Выгрузка export_posts загружается import_posts без потерь."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Переносимый пост {number}'
+            )
+            for number in range(5)
+        ]
+        cls.pub_date = timezone.now() - dt.timedelta(days=30)
+        Post.objects.filter(pk=cls.posts[0].pk).update(pub_date=cls.pub_date)
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'posts.jsonl')
+        self.checkpoint = os.path.join(self.directory, 'checkpoint')
+        call_command('export_posts', self.path, stdout=StringIO())
+        self.post_ids = sorted(post.pk for post in self.posts)
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def import_posts(self, *args):
+        call_command(
+            'import_posts', self.path, '--checkpoint', self.checkpoint,
+            *args, stdout=StringIO()
+        )
+
+    def test_round_trip(self):
+        self.import_posts('--batch-size', '2')
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)), self.post_ids
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).pub_date, self.pub_date
+        )
+        author = User.objects.get(username='author')
+        self.assertEqual(author.get_full_name(), 'Лев Толстой')
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(Group.objects.get().posts_count, 2)
+        self.assertEqual(
+            Comment.objects.get().post_id, self.posts[1].pk
+        )
+        self.assertEqual(Profile.objects.get(user=author).posts_count, 5)
+        self.assertEqual(Profile.objects.get(user=author).followers_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user__username='reader').count(), 5
+        )
+        results = search.get_backend().search('переносимый')
+        self.assertEqual(results.count(), 5)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume_from_checkpoint(self):
+        """Строки до контрольной точки повторно не читаются."""
+        self.import_posts()
+        Post.objects.all().delete()
+        with open(self.path) as stream:
+            lines = stream.readlines()
+        post_lines = [
+            number for number, line in enumerate(lines, 1)
+            if '"model":"post"' in line
+        ]
+        write_checkpoint(self.checkpoint, post_lines[2])
+        self.import_posts()
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)),
+            self.post_ids[3:]
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_import_is_idempotent(self):
+        self.import_posts()
+        self.import_posts()
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_import_into_database_with_posts(self):
+        """Занятые pk получают новые значения, ссылки идут за ними."""
+        local = User.objects.create_user(username='local')
+        Post.objects.bulk_create(
+            Post(pk=pk, author=local, text=f'Местный пост {pk}')
+            for pk in self.post_ids
+        )
+        self.import_posts('--batch-size', '2')
+        self.assertEqual(
+            Post.objects.filter(author=local).count(), len(self.post_ids)
+        )
+        imported = Post.objects.filter(author__username='author')
+        self.assertEqual(imported.count(), 5)
+        self.assertFalse(
+            set(imported.values_list('pk', flat=True)) & set(self.post_ids)
+        )
+        self.assertEqual(
+            Comment.objects.get().post.text, 'Переносимый пост 1'
+        )
+        self.import_posts()
+        self.assertEqual(imported.count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_resume_resolves_remapped_posts(self):
+        """Соответствие pk постов переживает сбой в базе."""
+        local = User.objects.create_user(username='local')
+        Post.objects.bulk_create(
+            Post(pk=pk, author=local, text=f'Местный пост {pk}')
+            for pk in self.post_ids
+        )
+        with open(self.path) as stream:
+            lines = stream.readlines()
+        comment_line = next(
+            number for number, line in enumerate(lines)
+            if '"model":"comment"' in line
+        )
+        broken = lines.copy()
+        broken[comment_line] = '{"model":"unknown"}\n'
+        with open(self.path, 'w') as stream:
+            stream.writelines(broken)
+        with self.assertRaises(CommandError):
+            self.import_posts('--batch-size', '1')
+        self.assertLess(read_checkpoint(self.checkpoint), comment_line)
+        self.assertTrue(ImportedPost.objects.exists())
+        with open(self.path, 'w') as stream:
+            stream.writelines(lines)
+        self.import_posts()
+        self.assertEqual(
+            Comment.objects.get().post.text, 'Переносимый пост 1'
+        )
+        self.assertFalse(ImportedPost.objects.exists())
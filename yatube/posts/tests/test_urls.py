@@ -1,6 +1,6 @@
 from http import HTTPStatus
 
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Group, Post, User
@@ -13,6 +13,7 @@ URL_AUTHOR_PROFILE = reverse('posts:profile', args=[AUTHOR_USERNAME])
 URL_CREATE_POST = reverse('posts:post_create')
 
 
+@override_settings(PAGE_CACHE_TIMEOUT=0)
 class PostURLTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -1,14 +1,21 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.paginator import EmptyPage
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post, User
+from core.jobs import Worker
+from core.models import Job
+from posts import feed_cache
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 URL_INDEX = reverse('posts:index')
@@ -19,7 +26,7 @@ URL_AUTHOR_PROFILE = reverse('posts:profile', args=[AUTHOR_USERNAME])
 URL_CREATE_POST = reverse('posts:post_create')
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, PAGE_CACHE_TIMEOUT=0)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -130,6 +137,7 @@ class PostPagesTests(TestCase):
                     )
 
 
+@override_settings(PAGE_CACHE_TIMEOUT=0)
 class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -169,11 +177,64 @@ class PaginatorViewsTest(TestCase):
         )
 
     def test_index_second_page_contains_expected_number_posts(self):
-        response = self.client.get(URL_INDEX + '?page=2')
+        first_page = self.client.get(URL_INDEX).context['page_obj']
+        response = self.client.get(
+            URL_INDEX, {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
         self.assertEqual(
-            len(response.context['page_obj']),
+            len(second_page),
             (Post.objects.count() - settings.POSTS_PER_PAGE)
         )
+        self.assertIsNone(second_page.next_cursor)
+        first_ids = {post.pk for post in first_page}
+        self.assertFalse(first_ids & {post.pk for post in second_page})
+
+    def test_index_previous_cursor_returns_first_page(self):
+        first_page = self.client.get(URL_INDEX).context['page_obj']
+        self.assertIsNone(first_page.previous_cursor)
+        second_page = self.client.get(
+            URL_INDEX, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        response = self.client.get(
+            URL_INDEX, {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in first_page]
+        )
+
+    def test_page_navigation_methods_follow_cursors(self):
+        first_page = self.client.get(URL_INDEX).context['page_obj']
+        self.assertTrue(first_page.has_next())
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_other_pages())
+        self.assertEqual(first_page.start_index(), 1)
+        self.assertEqual(first_page.end_index(), settings.POSTS_PER_PAGE)
+        with self.assertRaises(EmptyPage):
+            first_page.previous_page_number()
+        second_page = self.client.get(
+            URL_INDEX, {'cursor': first_page.next_page_number()}
+        ).context['page_obj']
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        self.assertEqual(
+            second_page.previous_page_number(),
+            second_page.previous_cursor
+        )
+        self.assertEqual(
+            second_page.start_index(), settings.POSTS_PER_PAGE + 1
+        )
+        self.assertEqual(second_page.end_index(), Post.objects.count())
+        with self.assertRaises(EmptyPage):
+            second_page.next_page_number()
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(URL_INDEX, {'cursor': 'not-a-cursor'})
+        self.assertEqual(
+            len(response.context['page_obj']),
+            settings.POSTS_PER_PAGE
+        )
 
     def test_group_page_contains_expected_number_posts(self):
         response = self.client.get(URL_GROUP)
@@ -190,6 +251,7 @@ class PaginatorViewsTest(TestCase):
         )
 
 
+@override_settings(PAGE_CACHE_TIMEOUT=0)
 class CacheTest(TestCase):
     """
     при запуске теста в корневой папке проекта повляется мусор,
@@ -216,14 +278,86 @@ class CacheTest(TestCase):
             author=CacheTest.test_post_author
         )
         response_before = self.author_client.get(URL_INDEX)
-        post_cache.delete()
+        # update() не шлёт сигналов: фрагмент остаётся в кэше.
+        Post.objects.filter(pk=post_cache.pk).update(text='Изменённый текст')
         response_after = self.author_client.get(URL_INDEX)
         self.assertEqual(response_before.content, response_after.content)
         cache.clear()
         response_clear = self.author_client.get(URL_INDEX)
-        self.assertNotEqual(response_after, response_clear)
-
+        self.assertNotEqual(response_after.content, response_clear.content)
 
+    def test_cache_invalidated_on_post_changes(self):
+        response_before = self.author_client.get(URL_INDEX)
+        post_cache = Post.objects.create(
+            text='Тестовый пост кэша',
+            author=CacheTest.test_post_author
+        )
+        response_created = self.author_client.get(URL_INDEX)
+        self.assertNotEqual(response_before.content, response_created.content)
+        self.assertContains(response_created, post_cache.text)
+        post_cache.delete()
+        response_deleted = self.author_client.get(URL_INDEX)
+        self.assertNotContains(response_deleted, post_cache.text)
+
+    def test_saving_post_bumps_feeds_without_lookups(self):
+        group, other_group = (
+            Group.objects.create(title=slug, slug=slug, description='')
+            for slug in ('first', 'second')
+        )
+        post = Post.objects.create(
+            text='Пост', author=CacheTest.test_post_author, group=group
+        )
+        scopes = (
+            ('profile', AUTHOR_USERNAME),
+            ('group', 'first'),
+            ('group', 'second'),
+        )
+        versions = [feed_cache.get_version(*scope) for scope in scopes]
+        # Автор не загружен: имя читается вместе с прежней группой.
+        post = Post.objects.get(pk=post.pk)
+        post.group = other_group
+        with mock.patch('posts.groups.registry') as registry:
+            with CaptureQueriesContext(connection) as queries:
+                post.save()
+        registry.assert_not_called()
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "auth_user"' in query['sql']
+            or query['sql'].startswith('SELECT "posts_group"')
+        ])
+        for scope, version in zip(scopes, versions):
+            self.assertGreater(feed_cache.get_version(*scope), version)
+
+    def test_invalid_cursor_uses_first_page_cache(self):
+        first_page = self.author_client.get(URL_INDEX)
+        Post.objects.filter(pk=CacheTest.test_post.pk).update(
+            text='Изменённый текст'
+        )
+        for cursor in ('not-a-cursor', 'bm90LWpzb24'):
+            with self.subTest(cursor=cursor):
+                response = self.author_client.get(
+                    URL_INDEX, {'cursor': cursor}
+                )
+                self.assertEqual(response.content, first_page.content)
+
+    def test_cache_depends_on_page_and_authentication(self):
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=CacheTest.test_post_author)
+            for i in range(settings.POSTS_PER_PAGE)
+        )
+        first_page = self.author_client.get(URL_INDEX)
+        second_page = self.author_client.get(
+            URL_INDEX, {'cursor': first_page.context['page_obj'].next_cursor}
+        )
+        self.assertNotEqual(first_page.content, second_page.content)
+        self.assertContains(second_page, CacheTest.test_post.text)
+        anonymous_page = self.client.get(URL_INDEX)
+        self.assertNotContains(
+            anonymous_page, reverse('posts:follow_index')
+        )
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
 class FollowTest(TestCase):
     # создает мусор в корневой папке. Не понимаю почему
     @classmethod
@@ -308,3 +442,199 @@ class FollowTest(TestCase):
             unfollow_count_before,
             len(response_unfollow.context['page_obj'])
         )
+
+
+@override_settings(JOBS_EAGER=True, PAGE_CACHE_TIMEOUT=0)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки', author=cls.author
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTest.reader)
+
+    def follow_feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_unfollow_clears_timeline(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[AUTHOR_USERNAME])
+        )
+        self.assertEqual(self.follow_feed(), [TimelineTest.old_post.pk])
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[AUTHOR_USERNAME])
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTest.reader).exists()
+        )
+        self.assertEqual(self.follow_feed(), [])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(
+            user=TimelineTest.reader, author=TimelineTest.author
+        )
+        new_post = Post.objects.create(
+            text='Новый пост', author=TimelineTest.author
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=TimelineTest.reader, post=new_post
+            ).exists()
+        )
+        self.assertEqual(
+            self.follow_feed(),
+            [new_post.pk, TimelineTest.old_post.pk]
+        )
+
+    @override_settings(JOBS_EAGER=False, TIMELINE_INLINE_LIMIT=0)
+    def test_large_timeline_changes_are_queued(self):
+        follow = Follow.objects.create(
+            user=TimelineTest.reader, author=TimelineTest.author
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        Worker().run_once()
+        self.assertEqual(self.follow_feed(), [TimelineTest.old_post.pk])
+        follow.delete()
+        Worker().run_once()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        Follow.objects.create(
+            user=TimelineTest.reader, author=TimelineTest.author
+        )
+        new_post = Post.objects.create(
+            text='Пост популярного автора', author=TimelineTest.author
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            self.follow_feed(),
+            [new_post.pk, TimelineTest.old_post.pk]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_gets_posts_fanned_out(self):
+        other_reader = User.objects.create_user(username='other_reader')
+        Follow.objects.create(
+            user=TimelineTest.reader, author=TimelineTest.author
+        )
+        Follow.objects.create(user=other_reader, author=TimelineTest.author)
+        celebrity_post = Post.objects.create(
+            text='Пост выше порога', author=TimelineTest.author
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=celebrity_post).exists()
+        )
+        Follow.objects.get(user=other_reader).delete()
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=TimelineTest.reader
+            ).values_list('post_id', flat=True)),
+            {celebrity_post.pk, TimelineTest.old_post.pk}
+        )
+        self.assertEqual(
+            self.follow_feed(),
+            [celebrity_post.pk, TimelineTest.old_post.pk]
+        )
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов страниц не превышает бюджет из settings."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Тестовая группа.Описание'
+        )
+        commenters = [
+            User.objects.create_user(username=f'commenter{i}')
+            for i in range(3)
+        ]
+        for i in range(settings.POSTS_PER_PAGE + 1):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Тестовый пост{i}'
+            )
+        cls.post = post
+        for commenter in commenters:
+            Follow.objects.create(user=commenter, author=cls.author)
+            Comment.objects.create(
+                post=post, author=commenter, text='Комментарий'
+            )
+        cls.reader = commenters[0]
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(QueryBudgetTest.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(QueryBudgetTest.reader)
+
+    def test_views_stay_within_query_budget(self):
+        pages = [
+            (self.client, URL_INDEX),
+            (self.reader_client, URL_INDEX),
+            (self.client, URL_GROUP),
+            (self.reader_client, URL_AUTHOR_PROFILE),
+            (
+                self.reader_client,
+                reverse('posts:post_detail', args=[QueryBudgetTest.post.pk])
+            ),
+            (self.reader_client, reverse('posts:follow_index')),
+            (self.author_client, URL_CREATE_POST),
+            (
+                self.author_client,
+                reverse('posts:post_edit', args=[QueryBudgetTest.post.pk])
+            ),
+        ]
+        for client, url in pages:
+            with self.subTest(url=url):
+                response = client.get(url)
+                view_name = response.resolver_match.view_name
+                stats = response.query_stats
+                self.assertLessEqual(
+                    stats.count,
+                    settings.QUERY_BUDGETS[view_name],
+                    f'{url}: {stats.count} запросов'
+                )
+                self.assertEqual(stats.duplicates, {}, f'N+1 на {url}')
+
+    def test_writes_stay_within_query_budget(self):
+        post = QueryBudgetTest.post
+        writes = [
+            (URL_CREATE_POST, {'text': 'Новый пост', 'group': post.group_id}),
+            (
+                reverse('posts:post_edit', args=[post.pk]),
+                {'text': 'Изменённый пост'}
+            ),
+            (
+                reverse('posts:add_comment', args=[post.pk]),
+                {'text': 'Комментарий'}
+            ),
+        ]
+        for url, data in writes:
+            with self.subTest(url=url):
+                with self.assertLogs('yatube.queries', 'INFO') as logs:
+                    response = self.author_client.post(url, data)
+                self.assertEqual(response.status_code, 302)
+                view_name = response.resolver_match.view_name
+                count = response.query_stats.count
+                self.assertLessEqual(
+                    count,
+                    settings.QUERY_BUDGETS[view_name, 'POST'],
+                    f'{url}: {count} запросов'
+                )
+                self.assertEqual(
+                    [record.levelname for record in logs.records], ['INFO']
+                )
@@ -0,0 +1,393 @@
+"""Перенос постов между экземплярами в формате JSONL.
+
+Каждая строка — одна запись с полем ``model``: пользователи, группы,
+посты, комментарии и подписки, именно в таком порядке, чтобы ссылки
+указывали на уже загруженные записи. На пользователей и группы
+записи ссылаются по username и slug, посты и комментарии сохраняют
+свои даты; пароли не выгружаются. Картинки переносятся ссылкой на
+файл в хранилище: сами файлы копируются отдельно.
+
+Посты и комментарии сохраняют свои pk, если те свободны в базе, а
+иначе получают новые. Комментарии находят свои посты через таблицу
+ImportedPost с pk постов в выгрузке: она живёт в базе, пока идёт
+импорт, и переживает сбой. Уже загруженные записи узнаются по автору
+и дате (комментарии ещё и по посту) и повторно не вставляются.
+
+Импорт читает файл построчно и пишет пачками через bulk_create, так
+что память не зависит от размера выгрузки, а сигналы моделей не
+срабатывают. Производные данные (счётчики, ленты подписок, поисковый
+индекс, версии лент) пересчитываются один раз в конце, а производные
+картинок ставятся в очередь задач. Повтор уже загруженной пачки
+безопасен, а после сбоя импорт продолжается с контрольной точки.
+"""
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import feed_cache, search, tasks, timeline
+from .counters import recount
+from .models import Comment, Follow, Group, ImportedPost, Post, User
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Encoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder округляет время до миллисекунд, а даты постов
+    # задают порядок лент и должны переноситься точно.
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _user_records():
+    for username, first_name, last_name in User.objects.order_by(
+        'pk'
+    ).values_list('username', 'first_name', 'last_name').iterator(
+        EXPORT_CHUNK_SIZE
+    ):
+        yield {
+            'model': 'user',
+            'username': username,
+            'first_name': first_name,
+            'last_name': last_name,
+        }
+
+
+def _group_records():
+    for slug, title, description in Group.objects.order_by(
+        'pk'
+    ).values_list('slug', 'title', 'description').iterator(
+        EXPORT_CHUNK_SIZE
+    ):
+        yield {
+            'model': 'group',
+            'slug': slug,
+            'title': title,
+            'description': description,
+        }
+
+
+def _post_records():
+    for pk, text, pub_date, updated, author, group, image in (
+        Post.objects.order_by('pk').values_list(
+            'pk', 'text', 'pub_date', 'updated', 'author__username',
+            'group__slug', 'image'
+        ).iterator(EXPORT_CHUNK_SIZE)
+    ):
+        yield {
+            'model': 'post',
+            'pk': pk,
+            'text': text,
+            'pub_date': pub_date,
+            'updated': updated,
+            'author': author,
+            'group': group,
+            'image': image,
+        }
+
+
+def _comment_records():
+    for pk, post, author, text, pub_date in Comment.objects.order_by(
+        'pk'
+    ).values_list(
+        'pk', 'post_id', 'author__username', 'text', 'pub_date'
+    ).iterator(EXPORT_CHUNK_SIZE):
+        yield {
+            'model': 'comment',
+            'pk': pk,
+            'post': post,
+            'author': author,
+            'text': text,
+            'pub_date': pub_date,
+        }
+
+
+def _follow_records():
+    for user, author in Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username'
+    ).iterator(EXPORT_CHUNK_SIZE):
+        yield {'model': 'follow', 'user': user, 'author': author}
+
+
+def export_posts(stream):
+    """Пишет все записи в stream построчно; возвращает их число."""
+    encoder = _Encoder(ensure_ascii=False, separators=(',', ':'))
+    count = 0
+    for records in (_user_records(), _group_records(), _post_records(),
+                    _comment_records(), _follow_records()):
+        for record in records:
+            stream.write(encoder.encode(record) + '\n')
+            count += 1
+    return count
+
+
+@contextmanager
+def keep_timestamps(model):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты записей."""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def _user_ids(usernames):
+    return dict(User.objects.filter(username__in=set(usernames)).values_list(
+        'username', 'pk'
+    ))
+
+
+def _allocate_pks(model, source_pks):
+    """Оставляет свободные в базе pk выгрузки, занятые заменяет новыми."""
+    taken = set(model.objects.filter(pk__in=source_pks).values_list(
+        'pk', flat=True
+    ))
+    last_pk = max([
+        model.objects.aggregate(last=Max('pk'))['last'] or 0, *source_pks
+    ])
+    pks = {}
+    for source_pk in source_pks:
+        pk = source_pk
+        if pk in taken:
+            last_pk += 1
+            pk = last_pk
+        taken.add(pk)
+        pks[source_pk] = pk
+    return pks
+
+
+def _reset_sequences(*models):
+    """Сдвигает последовательности pk после вставки с явными pk."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def _load_users(records):
+    password = make_password(None)
+    User.objects.bulk_create([
+        User(
+            username=record['username'],
+            first_name=record.get('first_name', ''),
+            last_name=record.get('last_name', ''),
+            password=password
+        )
+        for record in records
+    ], ignore_conflicts=True)
+
+
+def _load_groups(records):
+    Group.objects.bulk_create([
+        Group(
+            slug=record['slug'],
+            title=record['title'],
+            description=record.get('description', '')
+        )
+        for record in records
+    ], ignore_conflicts=True)
+
+
+def _imported_posts(source_pks):
+    """pk постов в базе по их pk в выгрузке."""
+    return dict(ImportedPost.objects.filter(
+        source_pk__in=set(source_pks)
+    ).values_list('source_pk', 'post_id'))
+
+
+def _load_posts(records):
+    authors = _user_ids(record['author'] for record in records)
+    groups = dict(Group.objects.filter(
+        slug__in={record.get('group') for record in records}
+    ).values_list('slug', 'pk'))
+    imported = _imported_posts(record['pk'] for record in records)
+    records = [
+        record for record in records
+        if record['author'] in authors and record['pk'] not in imported
+    ]
+    for record in records:
+        record['pub_date'] = parse_datetime(record['pub_date'])
+    existing = defaultdict(list)
+    for pk, author_id, pub_date in Post.objects.filter(
+        author_id__in={authors[record['author']] for record in records},
+        pub_date__in={record['pub_date'] for record in records}
+    ).order_by('pk').values_list('pk', 'author_id', 'pub_date'):
+        existing[author_id, pub_date].append(pk)
+    loaded, new = {}, []
+    for record in records:
+        same = existing[authors[record['author']], record['pub_date']]
+        if same:
+            loaded[record['pk']] = same.pop(0)
+        else:
+            new.append(record)
+    pks = _allocate_pks(Post, [record['pk'] for record in new])
+    posts = [
+        Post(
+            pk=pks[record['pk']],
+            text=record['text'],
+            pub_date=record['pub_date'],
+            updated=(
+                parse_datetime(record.get('updated') or '')
+                or record['pub_date']
+            ),
+            author_id=authors[record['author']],
+            group_id=groups.get(record.get('group')),
+            image=record.get('image') or ''
+        )
+        for record in new
+    ]
+    with keep_timestamps(Post):
+        Post.objects.bulk_create(posts)
+    _reset_sequences(Post)
+    ImportedPost.objects.bulk_create(
+        ImportedPost(source_pk=source_pk, post_id=pk)
+        for source_pk, pk in {**loaded, **pks}.items()
+    )
+
+
+def _load_comments(records):
+    authors = _user_ids(record['author'] for record in records)
+    post_ids = _imported_posts(record['post'] for record in records)
+    records = [
+        {
+            **record,
+            'post': post_ids[record['post']],
+            'author': authors[record['author']],
+            'pub_date': parse_datetime(record['pub_date']),
+        }
+        for record in records
+        if record['author'] in authors and record['post'] in post_ids
+    ]
+    existing = defaultdict(int)
+    for key in Comment.objects.filter(
+        post_id__in={record['post'] for record in records},
+        pub_date__in={record['pub_date'] for record in records}
+    ).values_list('post_id', 'author_id', 'pub_date'):
+        existing[key] += 1
+    new = []
+    for record in records:
+        key = (record['post'], record['author'], record['pub_date'])
+        if existing[key]:
+            existing[key] -= 1
+        else:
+            new.append(record)
+    pks = _allocate_pks(Comment, [record['pk'] for record in new])
+    comments = [
+        Comment(
+            pk=pks[record['pk']],
+            post_id=record['post'],
+            author_id=record['author'],
+            text=record['text'],
+            pub_date=record['pub_date']
+        )
+        for record in new
+    ]
+    with keep_timestamps(Comment):
+        Comment.objects.bulk_create(comments)
+    _reset_sequences(Comment)
+
+
+def _load_follows(records):
+    users = _user_ids(
+        username for record in records
+        for username in (record['user'], record['author'])
+    )
+    Follow.objects.bulk_create([
+        Follow(
+            user_id=users[record['user']],
+            author_id=users[record['author']]
+        )
+        for record in records
+        if record['user'] in users and record['author'] in users
+        and record['user'] != record['author']
+    ], ignore_conflicts=True)
+
+
+def rebuild_derived():
+    """Пересчитывает всё, что сигналы поддерживают при обычной записи.
+
+    Нужен после bulk_create, который сигналов не отправляет.
+    """
+    recount()
+    timeline.rebuild()
+    search.get_backend().rebuild()
+    feed_cache.bump_version(*feed_cache.GLOBAL_SCOPE)
+    post_ids = Post.objects.exclude(image='').filter(
+        derivatives__isnull=True
+    ).values_list('pk', flat=True)
+    for post_id in post_ids.iterator():
+        tasks.build_image_derivatives.delay(post_id)
+
+
+LOADERS = {
+    'user': _load_users,
+    'group': _load_groups,
+    'post': _load_posts,
+    'comment': _load_comments,
+    'follow': _load_follows,
+}
+
+
+class Importer:
+    """Загружает выгрузку export_posts пачками по batch_size записей.
+
+    После каждой пачки в on_checkpoint передаётся номер последней
+    загруженной строки. Повторный запуск с этим start_line пропускает
+    уже загруженные строки; запуск с начала забывает посты прежнего,
+    оборванного импорта.
+    """
+
+    def __init__(self, batch_size=1000, on_checkpoint=None):
+        self.batch_size = batch_size
+        self.on_checkpoint = on_checkpoint
+        self.loaded = 0
+
+    def _flush(self, model, batch, line_number):
+        if batch:
+            with transaction.atomic():
+                LOADERS[model](batch)
+            self.loaded += len(batch)
+        if self.on_checkpoint is not None:
+            self.on_checkpoint(line_number)
+
+    def load(self, stream, start_line=0):
+        if not start_line:
+            ImportedPost.objects.all().delete()
+        model, batch, line_number = None, [], start_line
+        for number, line in enumerate(stream, 1):
+            if number <= start_line or not line.strip():
+                continue
+            record = json.loads(line)
+            if record['model'] not in LOADERS:
+                raise ValueError(
+                    f'Строка {number}: неизвестная модель {record["model"]}'
+                )
+            if record['model'] != model or len(batch) >= self.batch_size:
+                self._flush(model, batch, line_number)
+                model, batch = record['model'], []
+            batch.append(record)
+            line_number = number
+        self._flush(model, batch, line_number)
+        return self.loaded
+
+    def rebuild(self):
+        """Пересчитывает производные данные после загрузки."""
+        rebuild_derived()
+        ImportedPost.objects.all().delete()
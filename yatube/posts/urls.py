@@ -1,12 +1,13 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('create/', views.post_create, name='post_create'),
+    path('group/', views.group_list, name='group_list'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path(
@@ -20,6 +21,11 @@ urlpatterns = [
         name="profile_unfollow"
     ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
@@ -27,4 +33,23 @@ urlpatterns = [
     ),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('feed/rss/', feeds.feed_view(feeds.PostsFeed, 'rss'),
+         name='index_rss'),
+    path('feed/atom/', feeds.feed_view(feeds.PostsFeed, 'atom'),
+         name='index_atom'),
+    path('group/<slug:slug>/rss/', feeds.feed_view(feeds.GroupFeed, 'rss'),
+         name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.feed_view(feeds.GroupFeed, 'atom'),
+         name='group_atom'),
+    path(
+        'profile/<str:username>/rss/',
+        feeds.feed_view(feeds.ProfileFeed, 'rss'),
+        name='profile_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.feed_view(feeds.ProfileFeed, 'atom'),
+        name='profile_atom'
+    ),
+    path('search/', views.search_posts, name='search'),
 ]
@@ -1,70 +1,136 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from . import groups, search, tasks, timeline
+from .conditional import (conditional_page, group_modified, post_modified,
+                          profile_modified)
+from .feed_cache import feed_cache_context
+from .forms import CommentForm, PostForm, SearchForm
+from .models import Comment, Follow, Post, User
+from .paginator import COMMENT_KEYS, paginate
 
 
 def index(request):
-    post_list = Post.objects.select_related('author', 'group').all()
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.select_related(
+        'author', 'group'
+    ).prefetch_related('derivatives')
+    page_obj = paginate(request, post_list)
     context = {
         'page_obj': page_obj,
-        'index': True
+        'index': True,
+        **feed_cache_context('index'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_modified, lambda slug: ('group', slug))
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    group = groups.get_group_or_404(slug)
+    post_list = group.posts.select_related('author').prefetch_related(
+        'derivatives'
+    )
+    page_obj = paginate(request, post_list)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache_context('group', group.slug),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def group_list(request):
+    context = {
+        'groups': groups.registry().values(),
+        **feed_cache_context(*groups.SCOPE),
+    }
+    return render(request, 'posts/groups.html', context)
+
+
+@conditional_page(profile_modified, lambda username: ('profile', username))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group').all()
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            author=author,
-            user=request.user
-        ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('profile'),
+        username=username
+    )
+    posts = author.posts.select_related('group').prefetch_related(
+        'derivatives'
+    )
+    page_obj = paginate(request, posts)
     context = {
         'page_obj': page_obj,
         'author': author,
-        'following': following
+        **feed_cache_context('profile', author.username),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_modified, lambda post_id: ('post', post_id))
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related(
+            'author__profile', 'group'
+        ).prefetch_related('derivatives'),
+        pk=post_id
+    )
     form = CommentForm()
-    comments = post.comments.all()
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': _comments(request, post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def _comments(request, post_id):
+    # Первая страница выводится в странице поста, следующие подгружает
+    # post_comments по курсору из ссылки «Показать ещё».
+    return paginate(
+        request,
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        keys=COMMENT_KEYS
+    )
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев — фрагмент для страницы поста."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post_id': post_id,
+        'comments': _comments(request, post_id),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def search_posts(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        group = form.cleaned_data['group']
+        author = form.cleaned_data['author']
+        results = search.get_backend().search(
+            form.cleaned_data['q'],
+            group_id=group.pk if group else None,
+            author_id=author.pk if author else None
+        )
+        page_obj = Paginator(results, settings.POSTS_PER_PAGE).get_page(
+            request.GET.get('page')
+        )
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'query_string': query.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
@@ -73,13 +139,16 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    if post.image:
+        tasks.build_image_derivatives.delay(post.pk)
     return redirect('posts:profile', post.author)
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
+    if request.user.id != post.author_id:
         return redirect('posts:post_detail', post_id=post.id)
     form = PostForm(
         request.POST or None,
@@ -94,10 +163,13 @@ def post_edit(request, post_id):
         }
         return render(request, 'posts/create_post.html', context)
     post = form.save()
+    if 'image' in form.changed_data:
+        tasks.build_image_derivatives.delay(post.pk)
     return redirect('posts:post_detail', post_id=post.id)
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = Post.objects.get(pk=post_id)
     form = CommentForm(request.POST or None)
@@ -111,10 +183,7 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = timeline.follow_page(request)
     context = {
         'page_obj': page_obj,
         'follow': True
@@ -123,6 +192,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -134,6 +204,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
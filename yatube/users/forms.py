@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
+from django import forms
 from django.contrib.auth.forms import UserCreationForm
 
+from posts.models import Profile
+
 User = get_user_model()
 
 
@@ -8,3 +11,10 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class DigestForm(forms.ModelForm):
+    class Meta:
+        model = Profile
+        fields = ('digest',)
+        labels = {'digest': 'Присылать новые посты подписок'}
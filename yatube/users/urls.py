@@ -13,6 +13,7 @@ app_name = 'users'
 
 urlpatterns = [
     path('signup/', views.SignUp.as_view(), name='signup'),
+    path('digest/', views.DigestSettings.as_view(), name='digest'),
     path(
         'logout/',
         LogoutView.as_view(template_name='users/logged_out.html'),
@@ -1,8 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from django.views.generic import CreateView
+from django.views.generic import CreateView, UpdateView
 
-from .forms import CreationForm
+from posts.models import Profile
+
+from .forms import CreationForm, DigestForm
 
 User = get_user_model()
 
@@ -11,3 +14,12 @@ class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+
+class DigestSettings(LoginRequiredMixin, UpdateView):
+    form_class = DigestForm
+    success_url = reverse_lazy('users:digest')
+    template_name = 'users/digest.html'
+
+    def get_object(self, queryset=None):
+        return Profile.objects.get_or_create(user=self.request.user)[0]
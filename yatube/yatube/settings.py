@@ -46,15 +46,21 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'posts.page_cache.AnonymousPageCacheMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
+    'posts.page_cache.LateFragmentMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,12 +68,25 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Профиль шаблонов выбирается переменной окружения YATUBE_TEMPLATE_PROFILE.
+# В production шаблоны кэшируются скомпилированными, а yatube.wsgi
+# компилирует их до первого запроса (core.warmup).
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_PROFILES = {
+    'development': TEMPLATE_LOADERS,
+    'production': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
+}
+TEMPLATE_PROFILE = os.getenv('YATUBE_TEMPLATE_PROFILE', 'development')
+TEMPLATE_WARMUP = TEMPLATE_PROFILE == 'production'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_PROFILES[TEMPLATE_PROFILE],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -85,13 +104,49 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Профиль соединений выбирается переменной окружения YATUBE_DB_PROFILE.
+# CONN_HEALTH_CHECKS и POOL_SIZE обрабатывают бэкенды core.db.backends:
+# проверка соединения перед переиспользованием и пул соединений процесса
+# для многопоточных серверов (POOL_SIZE > 0).
+DATABASE_PROFILES = {
+    'development': {
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'POOL_SIZE': 0,
+    },
+    'production': {
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_SIZE': int(os.getenv('YATUBE_DB_POOL_SIZE', 0)),
+    },
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': 'core.db.backends.' + os.getenv(
+            'YATUBE_DB_ENGINE', 'sqlite3'
+        ),
+        'NAME': os.getenv(
+            'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'USER': os.getenv('YATUBE_DB_USER', ''),
+        'PASSWORD': os.getenv('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.getenv('YATUBE_DB_HOST', ''),
+        'PORT': os.getenv('YATUBE_DB_PORT', ''),
+        **DATABASE_PROFILES[os.getenv('YATUBE_DB_PROFILE', 'development')],
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (core.db.signals): WAL не
+# блокирует читателей на время записи, NORMAL в режиме WAL не теряет
+# целостность, а busy_timeout (мс) заменяет ошибку блокировки ожиданием.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -136,18 +191,249 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма копятся в очереди (core.mail) и уходят пачками по
+# EMAIL_BATCH_SIZE через одно соединение EMAIL_DELIVERY_BACKEND.
+EMAIL_BACKEND = 'core.mail.SpoolBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_BATCH_SIZE = 100
+# Адрес сайта для ссылок в письмах.
+SITE_URL = os.getenv('YATUBE_SITE_URL', 'http://localhost:8000')
+# Письма с новыми постами подписок (posts.digest): читателей в пачке
+# и постов в письме.
+DIGEST_BATCH_SIZE = 500
+DIGEST_POSTS = 10
 
 POSTS_PER_PAGE = 10
+# Комментариев в странице поста и в каждой подгружаемой порции.
+COMMENTS_PER_PAGE = 20
+# Cache-Control страниц с условным GET (posts.conditional).
+PAGE_CACHE_CONTROL = {
+    'anonymous': {'public': True, 'max_age': 0, 'must_revalidate': True},
+    'authenticated': {'private': True, 'no_cache': True},
+}
+# Кэш целых страниц (posts.page_cache): вид и лента, чья версия входит
+# в ключ; части ленты — шаблоны str.format по аргументам URL.
+PAGE_CACHE_VIEWS = {
+    'posts:index': ('index',),
+    'posts:group_posts': ('group', '{slug}'),
+    'posts:profile': ('profile', '{username}'),
+    'posts:post_detail': ('post', '{post_id}'),
+    'posts:post_comments': ('post', '{post_id}'),
+    'posts:group_list': ('groups',),
+}
+# Фрагменты страниц для тега {% late %}: персональные и те, что меняются
+# чаще страницы, в которую вставлены (панель групп берётся из реестра).
+LATE_FRAGMENTS = {
+    'header': 'includes/header.html',
+    'switcher': 'posts/includes/switcher.html',
+    'follow_button': 'posts/includes/follow_button.html',
+    'post_actions': 'posts/includes/post_actions.html',
+    'group_sidebar': 'posts/includes/group_sidebar.html',
+}
+# Групп в боковой панели страницы группы.
+GROUP_SIDEBAR_SIZE = 10
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+PAGINATOR_COUNT_TIMEOUT = 60 * 5
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+# Постов в RSS и Atom (posts.feeds).
+FEED_ITEMS = 20
+TIMELINE_FANOUT_LIMIT = 5000
+# Сколько строк ленты можно записать сразу в запросе (подписчиков при
+# публикации, постов автора при подписке и отписке); больше — задачей
+# очереди. Небольшие изменения пользователь видит без задержки.
+TIMELINE_INLINE_LIMIT = 100
+TIMELINE_BACKFILL_SIZE = 200
+# Кадр картинки поста и ширины его производных для srcset.
+POST_IMAGE_CROP = (960, 339)
+POST_IMAGE_WIDTHS = (320, 640, 960, 1920)
+# Форматы в порядке предпочтения; недоступные Pillow пропускаются.
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+POST_IMAGE_SIZES = '(max-width: 1000px) 100vw, 960px'
+# Страницы сбрасываются сигналами; TTL ограничивает устаревание того,
+# что в версию ленты не входит. Ноль выключает кэш страниц.
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Очередь фоновых задач (core.jobs, manage.py run_workers). При
+# JOBS_EAGER задачи выполняются сразу, без очереди.
+JOBS_EAGER = False
+JOB_WORKER_THREADS = int(os.getenv('YATUBE_JOB_THREADS', 2))
+JOB_WORKER_PROCESSES = int(os.getenv('YATUBE_JOB_PROCESSES', 1))
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_ATTEMPTS = 5
+# Паузы между попытками, секунды: удваиваются с каждой неудачей.
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+# Задача, взятая обработчиком дольше этого времени назад, возвращается
+# в очередь.
+JOB_TIMEOUT = 60 * 10
+
+# Ограничение частоты запросов (core.ratelimit) по имени URL: вид ключа
+# ('user' или 'ip') и частота; 'methods' — учитываемые методы, по
+# умолчанию изменяющие данные.
+RATELIMIT_ENABLED = True
+RATELIMIT_CACHE = 'shared'
+# Адреса обратных прокси через запятую: за ними адрес клиента берётся
+# из X-Forwarded-For, иначе все клиенты считались бы одним адресом.
+RATELIMIT_TRUSTED_PROXIES = [
+    address.strip()
+    for address in os.getenv('YATUBE_TRUSTED_PROXIES', '').split(',')
+    if address.strip()
+]
+RATELIMITS = {
+    'posts:post_create': {'user': '10/m', 'ip': '30/m'},
+    'posts:add_comment': {'user': '20/m', 'ip': '60/m'},
+    'posts:profile_follow': {'methods': ('GET', 'POST'), 'user': '30/m'},
+    'posts:profile_unfollow': {'methods': ('GET', 'POST'), 'user': '30/m'},
+    'users:signup': {'ip': '5/h'},
+    'users:login': {'ip': '10/5m'},
+    'users:password_reset_form': {'ip': '5/h'},
+}
+
+# Реплика для чтения лент (core.db.routers): база YATUBE_DB_REPLICA_NAME
+# с теми же параметрами соединения, что у основной.
+DATABASE_REPLICA_NAME = os.getenv('YATUBE_DB_REPLICA_NAME')
+DATABASE_REPLICAS = []
+if DATABASE_REPLICA_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': DATABASE_REPLICA_NAME,
+        'HOST': os.getenv(
+            'YATUBE_DB_REPLICA_HOST', DATABASES['default']['HOST']
+        ),
+    }
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+# Виды, читающие с реплик, и сколько секунд после записи пользователь
+# читает только из основной базы (дольше задержки репликации).
+REPLICA_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:group_posts',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:post_comments',
+    'posts:follow_index',
+    'posts:index_rss',
+    'posts:index_atom',
+    'posts:group_rss',
+    'posts:group_atom',
+    'posts:profile_rss',
+    'posts:profile_atom',
+}
+REPLICA_PIN_COOKIE = 'primary'
+REPLICA_PIN_SECONDS = 10
+
+# Полнотекстовый поиск: FTS5 для SQLite, LIKE для остальных баз.
+SEARCH_BACKEND = (
+    'posts.search.FTS5SearchBackend'
+    if DATABASES['default']['ENGINE'].endswith('sqlite3')
+    else 'posts.search.SimpleSearchBackend'
+)
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Допустимое число SQL-запросов на один запрос к странице: по имени URL
+# для GET и HEAD, по паре (имя URL, метод) для записи — она обновляет
+# счётчики, ленты подписчиков и поисковый индекс.
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_list': 2,
+    'posts:group_posts': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 7,
+    'posts:post_comments': 3,
+    'posts:index_rss': 1,
+    'posts:index_atom': 1,
+    'posts:group_rss': 2,
+    'posts:group_atom': 2,
+    'posts:profile_rss': 2,
+    'posts:profile_atom': 2,
+    'posts:follow_index': 6,
+    'posts:post_create': 5,
+    'posts:post_edit': 6,
+    'posts:search': 6,
+    'api:posts': 1,
+    'api:group_posts': 2,
+    'api:profile_posts': 2,
+    'api:post_comments': 2,
+    ('posts:post_create', 'POST'): 22,
+    ('posts:post_edit', 'POST'): 18,
+    ('posts:add_comment', 'POST'): 14,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'require_debug_true': {
+            '()': 'django.utils.log.RequireDebugTrue',
+        },
+        'require_debug_false': {
+            '()': 'django.utils.log.RequireDebugFalse',
+        },
+    },
+    'handlers': {
+        # В DEBUG пишется статистика каждого запроса, в бою — только
+        # превышения бюджета.
+        'queries': {
+            'level': 'INFO',
+            'filters': ['require_debug_true'],
+            'class': 'logging.StreamHandler',
+        },
+        'queries_over_budget': {
+            'level': 'WARNING',
+            'filters': ['require_debug_false'],
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube.queries': {
+            'handlers': ['queries', 'queries_over_budget'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Общий кэш (L2) выбирается переменной окружения YATUBE_CACHE, по
+# умолчанию — файл SQLite, общий для всех воркеров; перед ним в каждом
+# процессе стоит короткоживущий локальный LRU (L1). locmem живёт внутри
+# одного процесса и подходит только тестам (core.runner).
+SHARED_CACHES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'redis': {
+        'BACKEND': 'core.cache.backends.RedisCache',
+        'LOCATION': os.getenv('YATUBE_REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.backends.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'L1_TIMEOUT': 5,
+            'L1_MAX_ENTRIES': 1000,
+            'L1_BYPASS_PREFIXES': ['feed-version:'],
+        },
+    },
+    'shared': SHARED_CACHES[os.getenv('YATUBE_CACHE', 'sqlite')],
 }
+
+TEST_RUNNER = 'core.runner.TestRunner'